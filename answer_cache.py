@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_question(question):
+    return " ".join(question.lower().split())
+
+
+class SemanticAnswerCache:
+    # Recent answers keyed by (normalized question, topic filter, top_k). An identical question
+    # is served without embedding it; otherwise the query embedding is compared against the
+    # cached entries with the same topic/top_k and served when cosine similarity >= threshold.
+    # Bounded by max_entries (LRU) and ttl seconds; invalidate() drops everything.
+
+    def __init__(self, max_entries=256, ttl=3600, threshold=0.95):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        for key in [k for k, e in self._entries.items() if e["created"] < cutoff]:
+            del self._entries[key]
+
+    def lookup_exact(self, question, topic_filter, top_k):
+        key = (normalize_question(question), topic_filter, top_k)
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.stats["exact_hits"] += 1
+            return entry
+
+    def lookup_similar(self, embedding, topic_filter, top_k):
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        with self._lock:
+            self._expire()
+            candidates = [(k, e) for k, e in self._entries.items()
+                          if k[1] == topic_filter and k[2] == top_k and e["embedding"] is not None and e["embedding"].shape == query.shape]
+            if not candidates:
+                self.stats["misses"] += 1
+                return None
+            scores = np.stack([e["embedding"] for _, e in candidates]) @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.stats["misses"] += 1
+                return None
+            key, entry = candidates[best]
+            self._entries.move_to_end(key)
+            self.stats["semantic_hits"] += 1
+            return dict(entry, similarity=float(scores[best]))
+
+    def put(self, question, topic_filter, top_k, embedding, answer, sources):
+        # embedding may be None (answered without one); such entries only serve exact matches
+        vector = None
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            vector /= np.linalg.norm(vector) or 1.0
+        key = (normalize_question(question), topic_filter, top_k)
+        with self._lock:
+            self._entries[key] = {"embedding": vector, "answer": answer, "sources": sources, "created": time.monotonic()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
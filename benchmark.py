@@ -0,0 +1,367 @@
+# Offline load test for the RAG pipeline. rag_query and ingest_knowledge_base run concurrently
+# against a local stand-in for the Endee REST API (a real HTTP server speaking the SDK's wire
+# format) and an in-process stand-in for the Gemini client, each with configurable latency.
+# Reports throughput, end-to-end p50/p99 and per-stage latency; with --baseline it exits
+# non-zero when a headline number regressed by more than --tolerance.
+#
+#   python benchmark.py --queries 300 --concurrency 8 --output bench.json
+#   python benchmark.py --queries 300 --concurrency 8 --baseline bench.json
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import unquote
+
+import msgpack
+import numpy as np
+from streamlit import config as streamlit_config, logger as streamlit_logger
+
+from local_index import LocalIndex
+from metrics import METRICS, percentile
+
+TOPICS = ["DSA & Algorithms", "System Design", "OOPs & Design Patterns", "HR & Behavioural", "Company-Specific", "Core CS Subjects"]
+# (name, higher is better) for every headline number compared against a baseline
+HEADLINE = [("ingest_items_per_s", True), ("queries_per_s", True), ("query_p50_ms", False), ("query_p99_ms", False), ("reingest_s", False)]
+
+
+class Latency:
+    # sleeps for a base latency with +/- jitter, seeded so runs are comparable
+    def __init__(self, ms, jitter, seed):
+        self.ms = ms
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self, ms=None):
+        ms = self.ms if ms is None else ms
+        if ms <= 0:
+            return
+        with self._lock:
+            factor = 1 + self._rng.uniform(-self.jitter, self.jitter)
+        time.sleep(ms * factor / 1000)
+
+
+# ─── Endee stand-in ────────────────────────────────────────────────────────────
+class EndeeHandler(BaseHTTPRequestHandler):
+    # keep-alive like the real server, so the pooled sessions are exercised
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.route("GET")
+
+    def do_POST(self):
+        self.route("POST")
+
+    def do_DELETE(self):
+        self.route("DELETE")
+
+    def reply(self, status, body=b"", content_type="application/json"):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def route(self, method):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.latency.sleep()
+        parts = [unquote(p) for p in self.path.split("?")[0].strip("/").split("/")]
+        if parts[:3] != ["api", "v1", "index"] or len(parts) < 4:
+            return self.reply(404, {"error": "not found"})
+        rest, server = parts[3:], self.server
+        if method == "GET" and rest == ["list"]:
+            with server.lock:
+                return self.reply(200, {"indexes": [dict(params, name=name) for name, (params, _) in server.indexes.items()]})
+        if method == "POST" and rest == ["create"]:
+            data = json.loads(body)
+            with server.lock:
+                if data["name"] in server.indexes:
+                    return self.reply(409, {"error": "index exists"})
+                server.indexes[data["name"]] = ({"dimension": data["dimension"], "space_type": data.get("space_type", "cosine"),
+                                                 "precision": data.get("precision", "float32")}, LocalIndex(None, dtype="float32"))
+            return self.reply(200, {"message": "created"})
+        with server.lock:
+            entry = server.indexes.get(rest[0])
+        if entry is None:
+            return self.reply(404, {"error": f"index {rest[0]} not found"})
+        params, index = entry
+        if method == "GET" and rest[1:] == ["info"]:
+            # the server spells a dense-only index as the string "None"
+            return self.reply(200, dict(params, name=rest[0], lib_token="offline", total_elements=len(index), M=16, ef_con=128, sparse_model="None"))
+        if method == "POST" and rest[1:] == ["vector", "insert"]:
+            # [id, zlib-compressed meta, filter JSON, norm, vector] per record; meta is stored opaque
+            rows = msgpack.unpackb(body, raw=False)
+            index.upsert([{"id": row[0], "meta": row[1], "filter": json.loads(row[2]) or {}, "vector": row[4]} for row in rows])
+            return self.reply(200, b"", "text/plain")
+        if method == "DELETE" and len(rest) == 4 and rest[1] == "vector" and rest[3] == "delete":
+            if not index.delete([rest[2]]):
+                return self.reply(404, {"error": f"vector {rest[2]} not found"})
+            return self.reply(200, b"1", "text/plain")
+        if method == "POST" and rest[1:] == ["search"]:
+            data = json.loads(body)
+            try:
+                hits = index.query(data["vector"], top_k=data["k"], filter=json.loads(data["filter"]) if data.get("filter") else None)
+            except ValueError as e:
+                return self.reply(400, {"error": str(e)})
+            rows = [[h["similarity"], h["id"], h["meta"], json.dumps(h["filter"]), 1.0, []] for h in hits]
+            return self.reply(200, msgpack.packb(rows, use_bin_type=True), "application/msgpack")
+        return self.reply(404, {"error": "not found"})
+
+
+class StandInEndee(ThreadingHTTPServer):
+    # Endee's REST API on 127.0.0.1 backed by in-memory LocalIndex instances
+    daemon_threads = True
+
+    def __init__(self, latency):
+        super().__init__(("127.0.0.1", 0), EndeeHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.indexes = {}
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+# ─── Gemini stand-in ───────────────────────────────────────────────────────────
+def hashed_embedding(text, dim):
+    # feature-hashed bag of words: deterministic, and texts sharing words land close together
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in text.lower().split():
+        h = zlib.crc32(word.encode("utf-8"))
+        vector[h % dim] += 1.0 if h & 0x80000000 else -1.0
+    return vector.tolist()
+
+
+class StandInModels:
+    def __init__(self, dim, embed_latency, generate_latency, token_ms, tokens):
+        self.dim = dim
+        self.embed_latency = embed_latency
+        self.generate_latency = generate_latency
+        self.token_ms = token_ms
+        self.tokens = tokens
+
+    def list(self):
+        return [SimpleNamespace(name="models/text-embedding-004"), SimpleNamespace(name="models/gemini-2.0-flash")]
+
+    def embed_content(self, model, contents):
+        self.embed_latency.sleep()
+        contents = [contents] if isinstance(contents, str) else contents
+        return SimpleNamespace(embeddings=[SimpleNamespace(values=hashed_embedding(t, self.dim)) for t in contents])
+
+    def generate_content(self, model, contents):
+        self.generate_latency.sleep(self.generate_latency.ms + self.token_ms * self.tokens)
+        return SimpleNamespace(text=" ".join(["token"] * self.tokens))
+
+    def generate_content_stream(self, model, contents):
+        self.generate_latency.sleep()
+        for _ in range(self.tokens):
+            self.generate_latency.sleep(self.token_ms)
+            yield SimpleNamespace(text="token ")
+
+
+class StandInGemini:
+    def __init__(self, **kwargs):
+        self.models = StandInModels(**kwargs)
+
+
+# ─── Workload ──────────────────────────────────────────────────────────────────
+def write_corpus(path, size, seed, changed=0.0):
+    # synthetic Q&A bank; `changed` rewrites that share of the answers to simulate an edited corpus
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choice("bcdfghklmnprstvz") + rng.choice("aeiou") for _ in range(rng.randint(2, 4))) for _ in range(3000)]
+    edit = random.Random(seed + 1)
+    questions = []
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range(size):
+            question = "How does " + " ".join(rng.sample(vocab, 5)) + " work?"
+            answer = " ".join(rng.choice(vocab) for _ in range(60)) + "."
+            if edit.random() < changed:
+                answer += " Updated: " + " ".join(edit.sample(vocab, 8)) + "."
+            f.write(json.dumps({"id": f"bench_{n:06d}", "topic": TOPICS[n % len(TOPICS)], "question": question, "answer": answer}) + "\n")
+            questions.append((TOPICS[n % len(TOPICS)], question))
+    return questions
+
+
+def make_queries(questions, count, repeat, seed):
+    # paraphrased corpus questions (long enough to need an embedding), some repeated verbatim
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        if queries and rng.random() < repeat:
+            queries.append(rng.choice(queries))
+            continue
+        topic, question = rng.choice(questions)
+        words = question.rstrip("?").split()[2:-1]
+        rng.shuffle(words)
+        queries.append((topic if rng.random() < 0.3 else "All Topics", "Explain how " + " ".join(words) + " works in practice"))
+    return queries
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="rag-bench-")
+    corpus_path = os.path.join(workdir, "corpus.jsonl")
+    questions = write_corpus(corpus_path, args.items, args.seed)
+    endee = StandInEndee(Latency(args.endee_ms, args.jitter, args.seed))
+    threading.Thread(target=endee.serve_forever, daemon=True).start()
+    # the pipeline reads its configuration at import time
+    os.environ.update({
+        "GEMINI_API_KEY": "offline", "ENDEE_URL": endee.url, "ENDEE_AUTH_TOKEN": "", "VECTOR_BACKEND": args.backend,
+        "RETRIEVAL_MODE": args.mode, "CORPUS_PATHS": corpus_path, "CORPUS_CHUNK_CHARS": "0",
+        "EMBED_CACHE_PATH": os.path.join(workdir, "embeddings.sqlite3"), "INGEST_MANIFEST_PATH": os.path.join(workdir, "manifest.sqlite3"),
+        "CORPUS_CATALOG_PATH": os.path.join(workdir, "corpus.sqlite3"), "LEXICAL_INDEX_PATH": os.path.join(workdir, "lexical.npz"),
+        "LOCAL_INDEX_DIR": os.path.join(workdir, "local_index"), "INGEST_WORKERS": str(args.ingest_workers),
+        "INGEST_BATCH_SIZE": str(args.batch_size), "EMBED_RATE_LIMIT": str(args.rate_limit),
+        "ANSWER_CACHE_SIZE": str(args.answer_cache_size),
+    })
+    # outside `streamlit run` the caches log a bare-mode warning on every call; parse the config
+    # first, since that resets the log level
+    streamlit_config.get_option("logger.level")
+    streamlit_logger.set_log_level("error")
+    import rag
+    gemini = StandInGemini(dim=args.dim, embed_latency=Latency(args.embed_ms, args.jitter, args.seed + 2),
+                           generate_latency=Latency(args.generate_ms, args.jitter, args.seed + 3), token_ms=args.token_ms, tokens=args.tokens)
+    rag.get_genai_client = lambda: gemini
+    results, stages = {}, {}
+
+    started = time.perf_counter()
+    stats = rag.ingest_knowledge_base()
+    elapsed = time.perf_counter() - started
+    results["ingest_items_per_s"] = stats["total"] / elapsed
+    stages["ingest"] = METRICS.snapshot()
+    METRICS.reset()
+
+    # edit part of the corpus, then re-ingest it while the query load runs
+    write_corpus(corpus_path, args.items, args.seed, changed=args.churn)
+    queries = make_queries(questions, args.queries, args.repeat, args.seed)
+    latencies, errors = [], []
+
+    def ask(query):
+        topic, question = query
+        t0 = time.perf_counter()
+        try:
+            if args.stream:
+                _, tokens, _ = rag.rag_query_stream(question, topic, args.top_k)
+                for _ in tokens:
+                    pass
+            else:
+                rag.rag_query(question, topic, args.top_k)
+        except Exception as e:
+            errors.append(repr(e))
+            return
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    reingest = {}
+
+    def ingest_again():
+        t0 = time.perf_counter()
+        reingest["stats"] = rag.ingest_knowledge_base()
+        reingest["seconds"] = time.perf_counter() - t0
+
+    started = time.perf_counter()
+    ingester = threading.Thread(target=ingest_again)
+    ingester.start()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(ask, queries))
+    queries_done = time.perf_counter() - started
+    ingester.join()
+    stages["mixed"] = METRICS.snapshot()
+    endee.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    results["queries_per_s"] = len(latencies) / queries_done
+    results["query_p50_ms"] = percentile(latencies, 50)
+    results["query_p99_ms"] = percentile(latencies, 99)
+    results["reingest_s"] = reingest["seconds"]
+    return {"config": vars(args), "results": results, "stages": stages, "errors": errors[:20], "error_count": len(errors),
+            "reingest": reingest["stats"]}
+
+
+def print_report(report):
+    r = report["results"]
+    print(f"ingest      {report['config']['items']} items at {r['ingest_items_per_s']:.1f} items/s")
+    print(f"queries     {report['config']['queries']} at {r['queries_per_s']:.1f} q/s (concurrency {report['config']['concurrency']}), "
+          f"p50 {r['query_p50_ms']:.1f} ms, p99 {r['query_p99_ms']:.1f} ms, {report['error_count']} errors")
+    print(f"re-ingest   {report['reingest']['upserted']} changed items in {r['reingest_s']:.2f}s alongside the queries")
+    for phase, snapshot in report["stages"].items():
+        print(f"\n{phase:<20}{'count':>8}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for stage, s in sorted(snapshot["stages"].items()):
+            print(f"  {stage:<18}{s['count']:>8}{s['mean_ms']:>10.2f}{s['p50_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}")
+    for error in report["errors"]:
+        print("error:", error)
+
+
+def compare(report, baseline, tolerance):
+    # returns one line per headline number that got worse than the baseline by more than tolerance
+    regressions = []
+    for name, higher_is_better in HEADLINE:
+        old, new = baseline["results"].get(name), report["results"].get(name)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        if (change < -tolerance) if higher_is_better else (change > tolerance):
+            regressions.append(f"{name}: {old:.2f} -> {new:.2f} ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline throughput / latency benchmark for the RAG pipeline")
+    parser.add_argument("--items", type=int, default=2000, help="synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent rag_query callers")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--stream", action="store_true", help="drive rag_query_stream instead of rag_query")
+    parser.add_argument("--repeat", type=float, default=0.2, help="share of queries repeating an earlier one verbatim")
+    parser.add_argument("--churn", type=float, default=0.1, help="share of answers edited before the concurrent re-ingest")
+    parser.add_argument("--backend", choices=["endee", "local", "auto"], default="endee")
+    parser.add_argument("--mode", choices=["vector", "lexical", "hybrid"], default="hybrid")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--endee-ms", type=float, default=2, help="stand-in Endee latency per request")
+    parser.add_argument("--embed-ms", type=float, default=30, help="stand-in embedding latency per request")
+    parser.add_argument("--generate-ms", type=float, default=150, help="stand-in generation latency before the first token")
+    parser.add_argument("--token-ms", type=float, default=2, help="stand-in generation latency per token")
+    parser.add_argument("--tokens", type=int, default=50, help="tokens per generated answer")
+    parser.add_argument("--jitter", type=float, default=0.2, help="+/- share of random variation on every stand-in latency")
+    parser.add_argument("--ingest-workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--rate-limit", type=float, default=1000, help="embedding requests per second during ingest")
+    parser.add_argument("--answer-cache-size", type=int, default=256, help="0 disables the answer cache")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the full report as JSON")
+    parser.add_argument("--baseline", help="report from a previous --output to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression before failing")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS (beyond {:.0%}):".format(args.tolerance))
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 1 if report["error_count"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+import csv
+import json
+import os
+import re
+import sqlite3
+import threading
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet support is optional
+    pq = None
+
+from embedding_cache import content_hash
+
+REQUIRED_FIELDS = ("topic", "question", "answer")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+# bump when the catalog tables or the chunking change so existing catalogs are rebuilt
+CATALOG_SCHEMA = 3
+
+
+def _clean(record, source, position):
+    missing = [f for f in REQUIRED_FIELDS if not record.get(f)]
+    if missing:
+        raise ValueError(f"{source} record {position}: missing {', '.join(missing)}")
+    item = {"id": str(record.get("id") or ""), "topic": str(record["topic"]).strip(),
+            "question": str(record["question"]).strip(), "answer": str(record["answer"]).strip()}
+    if not item["id"]:
+        # stable id for rows that do not carry one
+        item["id"] = "q_" + content_hash(f"{item['topic']}\n{item['question']}")[:16]
+    return item
+
+
+def iter_records(path):
+    # yields one Q&A dict at a time; memory stays bounded regardless of file size
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        with open(path, encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                if line.strip():
+                    yield _clean(json.loads(line), path, n)
+    elif ext == ".csv":
+        with open(path, encoding="utf-8", newline="") as f:
+            for n, row in enumerate(csv.DictReader(f), 1):
+                yield _clean(row, path, n)
+    elif ext == ".parquet":
+        if pq is None:
+            raise ImportError("Reading Parquet corpora requires pyarrow (pip install pyarrow)")
+        n = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=1024):
+            for row in batch.to_pylist():
+                n += 1
+                yield _clean(row, path, n)
+    else:
+        raise ValueError(f"Unsupported corpus file type: {path}")
+
+
+def chunk_item(item, max_chars=1200):
+    # long answers are split on sentence boundaries into chunks that each keep the question;
+    # consecutive chunks share one sentence of overlap so context is not cut mid-thought
+    answer = item["answer"]
+    if max_chars <= 0 or len(answer) <= max_chars:
+        yield item
+        return
+    sentences = SENTENCE_END.split(answer)
+    chunk = []
+    part = 0
+    for sentence in sentences:
+        if chunk and len(" ".join(chunk + [sentence])) > max_chars:
+            part += 1
+            yield dict(item, id=f"{item['id']}#{part}", answer=" ".join(chunk), parent_id=item["id"])
+            # the overlap sentence is carried only where it fits beside the next one
+            chunk = chunk[-1:] if len(chunk[-1]) + 1 + len(sentence) <= max_chars else []
+        chunk.append(sentence)
+    part += 1
+    yield dict(item, id=f"{item['id']}#{part}", answer=" ".join(chunk), parent_id=item["id"])
+
+
+def iter_corpus(paths, max_chars=1200):
+    for path in paths:
+        for record in iter_records(path):
+            yield from chunk_item(record, max_chars)
+
+
+def corpus_signature(paths, max_chars):
+    parts = [f"schema={CATALOG_SCHEMA}", f"max_chars={max_chars}"]
+    for path in paths:
+        st = os.stat(path)
+        parts.append(f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}")
+    return content_hash("\n".join(parts))
+
+
+class CorpusCatalog:
+    # Persistent SQLite catalog of the corpus: "items" holds the chunks that get embedded and
+    # "sources" the Q&As as written, which topic counts and the Browse tab read, so neither
+    # scans the source files. sync() rebuilds it only when the source files (size/mtime) or
+    # the chunk size change.
+
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS items (seq INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, topic TEXT NOT NULL, question TEXT NOT NULL, answer TEXT NOT NULL, parent_id TEXT)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS items_topic ON items (topic, seq)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sources (seq INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, topic TEXT NOT NULL, question TEXT NOT NULL, answer TEXT NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sources_topic ON sources (topic, seq)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+    @property
+    def signature(self):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM settings WHERE key = 'signature'").fetchone()
+        return row[0] if row else None
+
+    def sync(self, paths, max_chars=1200, batch_size=1000):
+        signature = corpus_signature(paths, max_chars)
+        if signature == self.signature:
+            return False
+        with self._lock:
+            # one transaction: readers keep seeing the previous catalog until commit
+            try:
+                self._conn.execute("DELETE FROM items")
+                self._conn.execute("DELETE FROM sources")
+                batch, sources = [], []
+                for path in paths:
+                    for record in iter_records(path):
+                        sources.append((record["id"], record["topic"], record["question"], record["answer"]))
+                        for item in chunk_item(record, max_chars):
+                            batch.append((item["id"], item["topic"], item["question"], item["answer"], item.get("parent_id")))
+                        if len(batch) >= batch_size:
+                            self._insert(batch, sources)
+                            batch, sources = [], []
+                self._insert(batch, sources)
+                self._conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('signature', ?)", (signature,))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return True
+
+    def _insert(self, rows, sources):
+        # a later duplicate id replaces the earlier row
+        self._conn.executemany("INSERT OR REPLACE INTO items (id, topic, question, answer, parent_id) VALUES (?, ?, ?, ?, ?)", rows)
+        self._conn.executemany("INSERT OR REPLACE INTO sources (id, topic, question, answer) VALUES (?, ?, ?, ?)", sources)
+
+    @staticmethod
+    def _item(row):
+        item = {"id": row[0], "topic": row[1], "question": row[2], "answer": row[3]}
+        if row[4]:
+            item["parent_id"] = row[4]
+        return item
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def source_count(self):
+        # Q&As as written; len() counts chunks
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sources").fetchone()[0]
+
+    def topic_counts(self):
+        # Q&As per topic, however many chunks each was split into
+        with self._lock:
+            rows = self._conn.execute("SELECT topic, COUNT(*) FROM sources GROUP BY topic ORDER BY MIN(seq)").fetchall()
+        return dict(rows)
+
+    def by_topic(self, topic, limit=50, offset=0):
+        # whole Q&As, not chunks
+        with self._lock:
+            rows = self._conn.execute("SELECT id, topic, question, answer, NULL FROM sources WHERE topic = ? ORDER BY seq LIMIT ? OFFSET ?",
+                                      (topic, limit, offset)).fetchall()
+        return [self._item(r) for r in rows]
+
+    def get(self, item_id):
+        with self._lock:
+            row = self._conn.execute("SELECT id, topic, question, answer, parent_id FROM items WHERE id = ?", (item_id,)).fetchone()
+        return self._item(row) if row else None
+
+    def missing(self, item_ids):
+        # the subset of item_ids that is not in the catalog
+        item_ids = list(item_ids)
+        found = set()
+        with self._lock:
+            for start in range(0, len(item_ids), 500):
+                chunk = item_ids[start:start + 500]
+                rows = self._conn.execute(f"SELECT id FROM items WHERE id IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+                found.update(r[0] for r in rows)
+        return [i for i in item_ids if i not in found]
+
+    def first(self):
+        return next(self.iter_items(batch_size=1), None)
+
+    def iter_items(self, batch_size=1000):
+        # keyset pagination: bounded memory and no cursor held open between batches
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute("SELECT seq, id, topic, question, answer, parent_id FROM items WHERE seq > ? ORDER BY seq LIMIT ?",
+                                          (last, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._item(row[1:])
+            last = rows[-1][0]
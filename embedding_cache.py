@@ -0,0 +1,116 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    # Embeddings persisted in SQLite keyed by (model, sha256 of the text), with a
+    # bounded in-memory LRU in front so hot vectors never touch the disk.
+
+    def __init__(self, path, max_memory_items=4096):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, PRIMARY KEY (model, hash))")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "api_calls": 0}
+
+    def _remember(self, key, vector):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_memory_items:
+            self._lru.popitem(last=False)
+
+    def get(self, model, text):
+        key = (model, content_hash(text))
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self._lru[key]
+            row = self._conn.execute("SELECT vector FROM embeddings WHERE model = ? AND hash = ?", key).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            vector = array("f", row[0]).tolist()
+            self._remember(key, vector)
+            self.stats["disk_hits"] += 1
+            return vector
+
+    def put(self, model, text, vector):
+        key = (model, content_hash(text))
+        vector = list(vector)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                               (model, key[1], array("f", vector).tobytes()))
+            self._conn.commit()
+            self._remember(key, vector)
+
+    def put_many(self, model, texts, vectors):
+        rows = [(model, content_hash(t), list(v)) for t, v in zip(texts, vectors)]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                                   [(m, h, array("f", v).tobytes()) for m, h, v in rows])
+            self._conn.commit()
+            for m, h, v in rows:
+                self._remember((m, h), v)
+
+    def _setting(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_setting(self, key, value):
+        with self._lock:
+            if value is None:
+                self._conn.execute("DELETE FROM settings WHERE key = ?", (key,))
+            else:
+                self._conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    # the embedding model that last worked, so it is not rediscovered by trial and error
+    def resolved_model(self):
+        return self._setting("embed_model")
+
+    def set_resolved_model(self, model, dimension=None):
+        self._set_setting("embed_model", model)
+        if dimension:
+            self._set_setting("embed_dim", str(dimension))
+
+    def clear_resolved_model(self):
+        # the dimension is kept: vectors already ingested still have it
+        self._set_setting("embed_model", None)
+
+    def resolved_dimension(self):
+        value = self._setting("embed_dim")
+        return int(value) if value else None
+
+    def record_api_call(self, n=1):
+        with self._lock:
+            self.stats["api_calls"] += n
+
+    @property
+    def hits(self):
+        return self.stats["memory_hits"] + self.stats["disk_hits"]
+
+    @property
+    def misses(self):
+        return self.stats["misses"]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
@@ -0,0 +1,42 @@
+import threading
+import time
+
+
+class HealthMonitor:
+    # Caches the result of each named check for `ttl` seconds. A stale result is still
+    # returned immediately while a background thread refreshes it, so page renders never
+    # wait on a remote service after the very first check.
+
+    def __init__(self, checks, ttl=15):
+        self.checks = checks
+        self.ttl = ttl
+        self._results = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _run(self, name):
+        try:
+            result = (True, self.checks[name](), None)
+        except Exception as e:
+            result = (False, None, e)
+        with self._lock:
+            self._results[name] = (time.monotonic(),) + result
+            self._refreshing.discard(name)
+        return result
+
+    def refresh(self, name):
+        return self._run(name)
+
+    def get(self, name):
+        # returns (ok, value, error)
+        with self._lock:
+            cached = self._results.get(name)
+            stale = cached is not None and time.monotonic() - cached[0] > self.ttl
+            start_refresh = stale and name not in self._refreshing
+            if start_refresh:
+                self._refreshing.add(name)
+        if cached is None:
+            return self._run(name)
+        if start_refresh:
+            threading.Thread(target=self._run, args=(name,), daemon=True).start()
+        return cached[1:]
@@ -0,0 +1,279 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+from embedding_cache import content_hash
+
+# stage is one of "resume", "diff", "embedded", "upserted", "done"
+IngestEvent = namedtuple("IngestEvent", ["stage", "done", "total", "message"])
+
+
+def item_text(item):
+    return f"{item['question']}\n{item['answer']}"
+
+
+def item_hash(item, salt=""):
+    # salt carries the record schema version, so a payload change re-upserts everything
+    return content_hash(salt + json.dumps(item, sort_keys=True, ensure_ascii=False))
+
+
+class RateLimiter:
+    # token bucket shared by all workers; rate is requests per second
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, int(rate)))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_for = (1 - self._tokens) / self.rate
+            time.sleep(wait_for)
+
+
+def with_retry(fn, attempts=4, base_delay=0.5, max_delay=8.0):
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception:
+            if attempt == attempts - 1:
+                raise
+            # exponential backoff with full jitter
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+
+
+class IngestManifest:
+    # content hash of every item already upserted, per index, so re-ingests only embed what changed
+    def __init__(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS ingested (index_name TEXT NOT NULL, item_id TEXT NOT NULL, hash TEXT NOT NULL, PRIMARY KEY (index_name, item_id))")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS checkpoints (index_name TEXT PRIMARY KEY, signature TEXT NOT NULL, position INTEGER NOT NULL)")
+        self._conn.commit()
+
+    def stored_hashes(self, index_name, item_ids):
+        item_ids = list(item_ids)
+        found = {}
+        with self._lock:
+            # stay under SQLite's bound-parameter limit
+            for start in range(0, len(item_ids), 500):
+                chunk = item_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT item_id, hash FROM ingested WHERE index_name = ? AND item_id IN ({','.join('?' * len(chunk))})",
+                    [index_name, *chunk]).fetchall()
+                found.update(rows)
+        return found
+
+    def mark(self, index_name, id_hashes):
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO ingested (index_name, item_id, hash) VALUES (?, ?, ?)",
+                                   [(index_name, i, h) for i, h in id_hashes])
+            self._conn.commit()
+
+    def item_ids(self, index_name):
+        with self._lock:
+            rows = self._conn.execute("SELECT item_id FROM ingested WHERE index_name = ?", (index_name,)).fetchall()
+        return [r[0] for r in rows]
+
+    def forget(self, index_name, item_ids):
+        with self._lock:
+            self._conn.executemany("DELETE FROM ingested WHERE index_name = ? AND item_id = ?", [(index_name, i) for i in item_ids])
+            self._conn.commit()
+
+    def clear(self, index_name):
+        with self._lock:
+            self._conn.execute("DELETE FROM ingested WHERE index_name = ?", (index_name,))
+            self._conn.execute("DELETE FROM checkpoints WHERE index_name = ?", (index_name,))
+            self._conn.commit()
+
+    # number of leading stream items known to be upserted, valid only for the same corpus signature
+    def checkpoint(self, index_name, signature):
+        with self._lock:
+            row = self._conn.execute("SELECT signature, position FROM checkpoints WHERE index_name = ?", (index_name,)).fetchone()
+        return row[1] if row and row[0] == signature else 0
+
+    def set_checkpoint(self, index_name, signature, position):
+        with self._lock:
+            if position:
+                self._conn.execute("INSERT OR REPLACE INTO checkpoints (index_name, signature, position) VALUES (?, ?, ?)",
+                                   (index_name, signature, position))
+            else:
+                self._conn.execute("DELETE FROM checkpoints WHERE index_name = ?", (index_name,))
+            self._conn.commit()
+
+
+class DeferredManifest:
+    # buffers marks until commit(), for targets (the local index) that only become durable
+    # when saved as a whole; a crash before the save then leaves nothing wrongly recorded
+    def __init__(self, manifest):
+        self.manifest = manifest
+        self._marks = []
+        self._forgets = []
+
+    def stored_hashes(self, index_name, item_ids):
+        return self.manifest.stored_hashes(index_name, item_ids)
+
+    def item_ids(self, index_name):
+        return self.manifest.item_ids(index_name)
+
+    def mark(self, index_name, id_hashes):
+        self._marks.append((index_name, list(id_hashes)))
+
+    def forget(self, index_name, item_ids):
+        self._forgets.append((index_name, list(item_ids)))
+
+    def checkpoint(self, index_name, signature):
+        return 0
+
+    def set_checkpoint(self, index_name, signature, position):
+        pass
+
+    def commit(self):
+        for index_name, id_hashes in self._marks:
+            self.manifest.mark(index_name, id_hashes)
+        for index_name, item_ids in self._forgets:
+            self.manifest.forget(index_name, item_ids)
+        self._marks.clear()
+        self._forgets.clear()
+
+
+def _batches(iterable, size):
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def run_ingest(items, index_name, embed_batch, upsert, manifest, to_record,
+               batch_size=50, upsert_chunk=500, max_workers=4, rate_limit=10,
+               on_event=None, force=False, salt="", total=None, signature=None):
+    # Stages: diff against the manifest -> embed batches on a bounded worker pool ->
+    # upsert in chunks as batches finish. embed_batch(texts) returns one vector per
+    # text; to_record(item, vector) builds the upsert payload. Events are emitted on
+    # the calling thread so UI callbacks (e.g. a Streamlit progress bar) are safe.
+    # With a corpus `signature`, progress through the item stream is checkpointed so an
+    # interrupted run resumes after the last contiguous upserted batch.
+    emit = on_event or (lambda event: None)
+    if total is None and hasattr(items, "__len__"):
+        total = len(items)
+    limiter = RateLimiter(rate_limit)
+    stats = {"total": 0, "skipped": 0, "embedded": 0, "upserted": 0, "resumed": 0}
+    pending_upsert = []
+    # batch sequence number -> stream position after it; completed batches advance the checkpoint
+    batch_ends = {}
+    completed = set()
+    pending_seqs = []
+    next_seq = [0]
+
+    start = manifest.checkpoint(index_name, signature) if signature and not force else 0
+    if start:
+        items = islice(items, start, None)
+        stats["resumed"] = stats["total"] = start
+        emit(IngestEvent("resume", start, total, f"Resuming after {start} items"))
+
+    def complete(seqs):
+        completed.update(seqs)
+        position = None
+        while next_seq[0] in completed:
+            completed.discard(next_seq[0])
+            position = batch_ends.pop(next_seq[0])
+            next_seq[0] += 1
+        if position is not None and signature:
+            manifest.set_checkpoint(index_name, signature, position)
+
+    def embed(seq, batch):
+        texts = [item_text(item) for item, _ in batch]
+
+        def call():
+            limiter.acquire()
+            return embed_batch(texts)
+        return seq, batch, with_retry(call)
+
+    def flush():
+        if not pending_upsert:
+            return
+        records = [to_record(item, vector) for (item, _), vector in pending_upsert]
+        with_retry(lambda: upsert(records))
+        # only mark after the upsert landed, so a crash never records unsent items
+        manifest.mark(index_name, [(item["id"], h) for (item, h), _ in pending_upsert])
+        stats["upserted"] += len(pending_upsert)
+        pending_upsert.clear()
+        complete(pending_seqs)
+        pending_seqs.clear()
+        emit(IngestEvent("upserted", stats["upserted"] + stats["skipped"] + stats["resumed"], total, f"Upserted {stats['upserted']} vectors"))
+
+    def collect(done):
+        for future in done:
+            seq, batch, vectors = future.result()
+            pending_seqs.append(seq)
+            if len(vectors) != len(batch):
+                raise Exception(f"Embedding batch returned {len(vectors)} vectors for {len(batch)} items")
+            pending_upsert.extend(zip(batch, vectors))
+            stats["embedded"] += len(batch)
+            emit(IngestEvent("embedded", stats["embedded"] + stats["skipped"] + stats["resumed"], total, f"Embedded {stats['embedded']} items"))
+        if len(pending_upsert) >= upsert_chunk:
+            flush()
+
+    in_flight = set()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for seq, batch in enumerate(_batches(items, batch_size)):
+            stats["total"] += len(batch)
+            batch_ends[seq] = stats["total"]
+            hashed = [(item, item_hash(item, salt)) for item in batch]
+            stored = {} if force else manifest.stored_hashes(index_name, [item["id"] for item, _ in hashed])
+            changed = [(item, h) for item, h in hashed if stored.get(item["id"]) != h]
+            stats["skipped"] += len(hashed) - len(changed)
+            if not changed:
+                emit(IngestEvent("diff", stats["embedded"] + stats["skipped"] + stats["resumed"], total, f"Skipped {stats['skipped']} unchanged items"))
+                complete([seq])
+                continue
+            # keep a bounded number of batches in flight so memory does not grow with the corpus
+            if len(in_flight) >= max_workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight.add(pool.submit(embed, seq, changed))
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+    flush()
+    if signature:
+        # a finished run starts the next one from the top so later edits are diffed
+        manifest.set_checkpoint(index_name, signature, 0)
+    emit(IngestEvent("done", stats["total"], total, f"Embedded {stats['embedded']}, skipped {stats['skipped']} unchanged"))
+    return stats
+
+
+def prune_removed(index_name, manifest, missing, delete, batch_size=500):
+    # deletes items the manifest recorded for index_name that are gone from the corpus (removed
+    # from the source, or re-chunked under new ids); missing(ids) returns the ids the corpus no
+    # longer has. Items are forgotten only after their delete landed. Returns the number deleted.
+    removed = 0
+    for batch in _batches(manifest.item_ids(index_name), batch_size):
+        stale = list(missing(batch))
+        if not stale:
+            continue
+        with_retry(lambda: delete(stale))
+        manifest.forget(index_name, stale)
+        removed += len(stale)
+    return removed
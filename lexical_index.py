@@ -0,0 +1,191 @@
+import json
+import math
+import os
+import re
+import threading
+from array import array
+
+import numpy as np
+
+from embedding_cache import content_hash
+
+TOKEN = re.compile(r"[a-z0-9]+(?:[+#][a-z0-9+#]*)?")
+STOPWORDS = frozenset("a an and are as at be by do does for from how i in is it me my of on or the this to vs what when which who why with you your".split())
+
+
+def tokenize(text):
+    return [t for t in TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def rrf_fuse(result_lists, top_k, k=60):
+    # reciprocal rank fusion over lists of hits keyed by "id"; keeps the first hit seen per id
+    scores, hits = {}, {}
+    for results in result_lists:
+        for rank, hit in enumerate(results):
+            scores[hit["id"]] = scores.get(hit["id"], 0.0) + 1.0 / (k + rank + 1)
+            hits.setdefault(hit["id"], hit)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [dict(hits[i], rrf=scores[i]) for i in ranked]
+
+
+class BM25Index:
+    # Okapi BM25 over question + answer text. Postings are parallel array('I') doc numbers and
+    # array('H') term frequencies per term, so the index stays compact and scoring is a few
+    # vectorized NumPy ops per query term. Updates append a new doc number and tombstone the
+    # old one; tombstones are compacted away once they make up a third of the docs.
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._postings = {}
+        self._doc_ids = []
+        self._doc_hash = []
+        self._doc_meta = []
+        self._doc_len = array("I")
+        self._question_terms = []
+        self._pos = {}
+        self._dead = set()
+        self._total_len = 0
+        self._topics = None
+
+    def __len__(self):
+        return len(self._pos)
+
+    def upsert(self, items):
+        changed = 0
+        with self._lock:
+            for item in items:
+                digest = content_hash(f"{item['topic']}\n{item['question']}\n{item['answer']}")
+                old = self._pos.get(item["id"])
+                if old is not None:
+                    if self._doc_hash[old] == digest:
+                        continue
+                    self._dead.add(old)
+                    self._total_len -= self._doc_len[old]
+                doc = len(self._doc_ids)
+                # the question is counted twice so a matching question outranks a passing mention
+                terms = tokenize(item["question"]) * 2 + tokenize(item["answer"])
+                counts = {}
+                for term in terms:
+                    counts[term] = counts.get(term, 0) + 1
+                for term, tf in counts.items():
+                    docs, tfs = self._postings.setdefault(term, (array("I"), array("H")))
+                    docs.append(doc)
+                    tfs.append(min(tf, 65535))
+                self._doc_ids.append(item["id"])
+                self._doc_hash.append(digest)
+                self._doc_meta.append({"topic": item["topic"], "question": item["question"], "answer": item["answer"]})
+                self._doc_len.append(len(terms))
+                self._question_terms.append(sorted(set(tokenize(item["question"]))))
+                self._pos[item["id"]] = doc
+                self._total_len += len(terms)
+                self._topics = None
+                changed += 1
+            if self._dead and len(self._dead) * 3 > len(self._doc_ids):
+                self._compact()
+        return changed
+
+    def ids(self):
+        with self._lock:
+            return list(self._pos)
+
+    def delete(self, ids):
+        # tombstones the docs for ids; returns how many were live
+        removed = 0
+        with self._lock:
+            for item_id in ids:
+                doc = self._pos.pop(item_id, None)
+                if doc is None:
+                    continue
+                self._dead.add(doc)
+                self._total_len -= self._doc_len[doc]
+                removed += 1
+            if self._dead and len(self._dead) * 3 > len(self._doc_ids):
+                self._compact()
+        return removed
+
+    def _compact(self):
+        live = [d for d in range(len(self._doc_ids)) if d not in self._dead]
+        items = [dict(self._doc_meta[d], id=self._doc_ids[d]) for d in live]
+        self._reset()
+        self.upsert(items)
+
+    def search(self, query, top_k=5, topic=None):
+        # returns hits shaped like vector results: {"id", "similarity", "score", "meta", "coverage"},
+        # where similarity is the BM25 score relative to the best hit and coverage is the share
+        # of query terms found in the hit's question
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            n_docs = len(self._pos)
+            if not terms or not n_docs:
+                return []
+            scores = np.zeros(len(self._doc_ids), dtype=np.float32)
+            lengths = np.frombuffer(self._doc_len, dtype=np.uint32).astype(np.float32)
+            norm = self.k1 * (1 - self.b + self.b * lengths / (self._total_len / n_docs))
+            for term in terms:
+                if term not in self._postings:
+                    continue
+                docs, tfs = self._postings[term]
+                docs = np.frombuffer(docs, dtype=np.uint32)
+                tfs = np.frombuffer(tfs, dtype=np.uint16).astype(np.float32)
+                df = len(docs)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                np.add.at(scores, docs, idf * tfs * (self.k1 + 1) / (tfs + norm[docs]))
+            if self._dead:
+                scores[list(self._dead)] = 0
+            if topic is not None:
+                if self._topics is None:
+                    self._topics = np.array([meta["topic"] for meta in self._doc_meta], dtype=object)
+                scores[self._topics != topic] = 0
+            candidates = np.flatnonzero(scores > 0)
+            if not len(candidates):
+                return []
+            k = min(top_k, len(candidates))
+            best = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            best = best[np.argsort(-scores[best], kind="stable")]
+            top = float(scores[best[0]])
+            return [{"id": self._doc_ids[d], "similarity": float(scores[d]) / top, "score": float(scores[d]),
+                     "meta": self._doc_meta[d], "coverage": len(set(terms) & set(self._question_terms[d])) / len(terms)}
+                    for d in best]
+
+    def save(self, path):
+        # CSR layout: every posting list concatenated into two flat arrays plus term offsets
+        with self._lock:
+            terms = sorted(self._postings)
+            offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            for i, term in enumerate(terms):
+                offsets[i + 1] = offsets[i] + len(self._postings[term][0])
+            docs = np.concatenate([np.frombuffer(self._postings[t][0], dtype=np.uint32) for t in terms]) if terms else np.zeros(0, dtype=np.uint32)
+            tfs = np.concatenate([np.frombuffer(self._postings[t][1], dtype=np.uint16) for t in terms]) if terms else np.zeros(0, dtype=np.uint16)
+            header = {"k1": self.k1, "b": self.b, "terms": terms, "doc_ids": self._doc_ids, "doc_hash": self._doc_hash,
+                      "doc_meta": self._doc_meta, "question_terms": self._question_terms, "dead": sorted(self._dead)}
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                np.savez(f, header=np.frombuffer(json.dumps(header, ensure_ascii=False).encode("utf-8"), dtype=np.uint8),
+                         offsets=offsets, docs=docs, tfs=tfs, doc_len=np.frombuffer(self._doc_len, dtype=np.uint32))
+            os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            header = json.loads(data["header"].tobytes().decode("utf-8"))
+            offsets, docs, tfs = data["offsets"], data["docs"], data["tfs"]
+            index = cls(k1=header["k1"], b=header["b"])
+            for i, term in enumerate(header["terms"]):
+                index._postings[term] = (array("I", docs[offsets[i]:offsets[i + 1]].tobytes()), array("H", tfs[offsets[i]:offsets[i + 1]].tobytes()))
+            index._doc_len = array("I", data["doc_len"].tobytes())
+        index._doc_ids = header["doc_ids"]
+        index._doc_hash = header["doc_hash"]
+        index._doc_meta = header["doc_meta"]
+        index._question_terms = header["question_terms"]
+        index._dead = set(header["dead"])
+        index._pos = {item_id: d for d, item_id in enumerate(index._doc_ids) if d not in index._dead}
+        index._total_len = sum(index._doc_len[d] for d in index._pos.values())
+        return index
@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+VECTORS_FILE = "vectors.npy"
+META_FILE = "meta.json"
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class LocalIndex:
+    # In-process drop-in for an Endee index: normalized embeddings in one contiguous
+    # (memory-mapped once saved) array, metadata alongside, brute-force cosine search.
+    # query() returns the same {"id", "similarity", "distance", "meta"} dicts as Endee and
+    # accepts the same filter syntax, e.g. [{"topic": {"$eq": "System Design"}}]; each
+    # (field, value) pair is kept as a row partition so filtered search never over-fetches.
+
+    def __init__(self, path, dtype="float16"):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.RLock()
+        self._vectors = np.zeros((0, 0), dtype=self.dtype)
+        self._size = 0
+        self._ids = []
+        self._meta = []
+        self._filters = []
+        self._pos = {}
+        self._partitions = None
+
+    @classmethod
+    def load(cls, path, dtype="float16"):
+        index = cls(path, dtype=dtype)
+        vectors_path = os.path.join(path, VECTORS_FILE)
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(vectors_path) and os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                data = json.load(f)
+            index._vectors = np.load(vectors_path, mmap_mode="r")
+            index.dtype = index._vectors.dtype
+            index._ids = data["ids"]
+            index._meta = data["meta"]
+            index._filters = data.get("filters") or [{} for _ in index._ids]
+            index._size = len(index._ids)
+            index._pos = {item_id: row for row, item_id in enumerate(index._ids)}
+        return index
+
+    def save(self):
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            vectors_path = os.path.join(self.path, VECTORS_FILE)
+            meta_path = os.path.join(self.path, META_FILE)
+            # write-then-rename so a reader never maps a half-written file
+            with open(vectors_path + ".tmp", "wb") as f:
+                np.save(f, np.ascontiguousarray(self._vectors[:self._size]))
+            with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"ids": self._ids, "meta": self._meta, "filters": self._filters}, f, ensure_ascii=False)
+            os.replace(vectors_path + ".tmp", vectors_path)
+            os.replace(meta_path + ".tmp", meta_path)
+
+    @property
+    def dimension(self):
+        return self._vectors.shape[1] if self._vectors.ndim == 2 else 0
+
+    def __len__(self):
+        return self._size
+
+    def _ensure_capacity(self, needed, dimension):
+        if self._size == 0 and self.dimension != dimension:
+            self._vectors = np.zeros((0, dimension), dtype=self.dtype)
+        if self.dimension != dimension:
+            raise ValueError(f"Vector dimension {dimension} does not match index dimension {self.dimension}")
+        # a loaded index is a read-only memmap; copy it into RAM on the first write
+        if len(self._vectors) < needed or not self._vectors.flags.writeable:
+            grown = np.zeros((max(needed, 2 * len(self._vectors), 64), dimension), dtype=self.dtype)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+
+    def upsert(self, records):
+        if not records:
+            return
+        vectors = _normalize([r["vector"] for r in records])
+        with self._lock:
+            new_ids = {r["id"] for r in records if r["id"] not in self._pos}
+            self._ensure_capacity(self._size + len(new_ids), vectors.shape[1])
+            for record, vector in zip(records, vectors):
+                row = self._pos.get(record["id"])
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._pos[record["id"]] = row
+                    self._ids.append(record["id"])
+                    self._meta.append(record.get("meta", {}))
+                    self._filters.append(record.get("filter", {}))
+                else:
+                    self._meta[row] = record.get("meta", {})
+                    self._filters[row] = record.get("filter", {})
+                self._vectors[row] = vector
+            self._partitions = None
+
+    def delete(self, ids):
+        # drops the rows for ids (unknown ids are ignored) and closes the gaps; returns the count
+        with self._lock:
+            rows = {self._pos[i] for i in ids if i in self._pos}
+            if not rows:
+                return 0
+            keep = [r for r in range(self._size) if r not in rows]
+            self._vectors = np.ascontiguousarray(self._vectors[keep]) if keep else np.zeros((0, self.dimension), dtype=self.dtype)
+            self._ids = [self._ids[r] for r in keep]
+            self._meta = [self._meta[r] for r in keep]
+            self._filters = [self._filters[r] for r in keep]
+            self._size = len(keep)
+            self._pos = {item_id: row for row, item_id in enumerate(self._ids)}
+            self._partitions = None
+            return len(rows)
+
+    def _partition(self, field, value):
+        if self._partitions is None:
+            grouped = {}
+            for row, tags in enumerate(self._filters):
+                for key, tag in tags.items():
+                    grouped.setdefault((key, tag), []).append(row)
+            self._partitions = {key: np.asarray(rows, dtype=np.int64) for key, rows in grouped.items()}
+        return self._partitions.get((field, value), np.zeros(0, dtype=np.int64))
+
+    def _rows_for(self, filter):
+        rows = None
+        for clause in filter:
+            for field, condition in clause.items():
+                if "$eq" in condition:
+                    matched = self._partition(field, condition["$eq"])
+                elif "$in" in condition:
+                    matched = np.unique(np.concatenate([self._partition(field, v) for v in condition["$in"]] or [np.zeros(0, dtype=np.int64)]))
+                else:
+                    raise ValueError(f"Unsupported filter operator for {field}: {condition}")
+                rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+        return rows
+
+    def _top_k(self, scores, rows, top_k):
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        hits = []
+        for i in best:
+            r = int(rows[i]) if rows is not None else int(i)
+            hits.append({"id": self._ids[r], "similarity": float(scores[i]), "distance": 1.0 - float(scores[i]), "meta": self._meta[r], "filter": self._filters[r]})
+        return hits
+
+    def query_batch(self, vectors, top_k=10, filter=None):
+        queries = _normalize(vectors)
+        with self._lock:
+            rows = self._rows_for(filter) if filter else None
+            if self._size == 0 or (rows is not None and len(rows) == 0):
+                return [[] for _ in range(len(queries))]
+            matrix = self._vectors[:self._size] if rows is None else self._vectors[rows]
+            scores = queries @ matrix.astype(np.float32, copy=False).T
+            return [self._top_k(row, rows, top_k) for row in scores]
+
+    def query(self, vector, top_k=10, filter=None):
+        return self.query_batch([vector], top_k=top_k, filter=filter)[0]
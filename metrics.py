@@ -0,0 +1,111 @@
+import json
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+# upper bounds (ms) of the exported latency buckets; anything slower lands in +Inf
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+def percentile(values, q):
+    # nearest-rank percentile of an unsorted sequence, q in [0, 100]
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class Histogram:
+    # Cumulative counts per fixed bucket (cheap, exportable, never forgets) plus a ring of the
+    # most recent samples, so percentiles reflect current behaviour rather than all-time history.
+
+    def __init__(self, buckets=BUCKETS_MS, window=2048):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, ms):
+        self.counts[bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.recent.append(ms)
+
+    def summary(self):
+        recent = list(self.recent)
+        return {"count": self.count, "total_ms": self.total, "mean_ms": self.total / self.count if self.count else None,
+                "p50_ms": percentile(recent, 50), "p95_ms": percentile(recent, 95), "p99_ms": percentile(recent, 99),
+                "max_ms": self.max, "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts))}
+
+
+class Metrics:
+    # Process-wide latency histograms per pipeline stage and plain event counters. span() is
+    # the usual entry point: it times the block, and a block that raises is still timed and
+    # also counted as "<stage>.errors".
+
+    def __init__(self, window=2048):
+        self.window = window
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def observe(self, stage, ms):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(window=self.window)
+            histogram.observe(ms)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    @contextmanager
+    def span(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.count(f"{stage}.errors")
+            raise
+        finally:
+            self.observe(stage, (time.perf_counter() - started) * 1000)
+
+    def snapshot(self):
+        with self._lock:
+            return {"stages": {stage: h.summary() for stage, h in self._histograms.items()}, "counters": dict(self._counters)}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix="placement_prep"):
+        # text exposition format; latencies are exported in seconds as Prometheus expects
+        snapshot = self.snapshot()
+        lines = [f"# TYPE {prefix}_stage_latency_seconds histogram"]
+        for stage, summary in sorted(snapshot["stages"].items()):
+            cumulative = 0
+            for bound, n in summary["buckets"].items():
+                cumulative += n
+                le = bound if bound == "+Inf" else repr(int(bound) / 1000)
+                lines.append(f'{prefix}_stage_latency_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_latency_seconds_sum{{stage="{stage}"}} {summary["total_ms"] / 1000}')
+            lines.append(f'{prefix}_stage_latency_seconds_count{{stage="{stage}"}} {summary["count"]}')
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'{prefix}_events_total{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+# shared by the app, the pipeline and the benchmark harness
+METRICS = Metrics()
@@ -0,0 +1,574 @@
+import streamlit as st
+from google import genai
+from google.genai import errors as genai_errors
+from endee import Endee
+from endee.exceptions import APIException, NotFoundException
+import itertools
+import os
+import random
+import time
+from urllib.parse import quote
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from corpus import CorpusCatalog
+from embedding_cache import EmbeddingCache
+from answer_cache import SemanticAnswerCache
+from health import HealthMonitor
+from ingest_pipeline import DeferredManifest, IngestManifest, item_text, prune_removed, run_ingest
+from lexical_index import BM25Index, rrf_fuse, tokenize
+from local_index import LocalIndex
+from metrics import METRICS
+
+# The RAG pipeline: configuration, shared clients, embedding, ingestion, retrieval and
+# generation. No UI here, so app.py renders it and benchmark.py drives it headless.
+
+# ─── Load secrets (works both locally and on Streamlit Cloud) ──────────────────
+def get_secret(key, default=""):
+    # Try st.secrets first (Streamlit Cloud), then env vars (local)
+    try:
+        return st.secrets[key]
+    except Exception:
+        return os.environ.get(key, default)
+
+gemini_key  = get_secret("GEMINI_API_KEY")
+# load Endee service URL/token
+# default is empty; tests fallback to localhost inside functions later
+endee_url   = get_secret("ENDEE_URL")
+endee_token = get_secret("ENDEE_AUTH_TOKEN")
+
+# ensure the URL includes a scheme, since users often paste just the hostname
+if endee_url and not endee_url.startswith("http://") and not endee_url.startswith("https://"):
+    endee_url = "https://" + endee_url
+
+INDEX_NAME = "placement_prep"
+# "endee", "local" (in-process NumPy index) or "auto" (Endee with local fallback)
+VECTOR_BACKEND = get_secret("VECTOR_BACKEND", "auto").lower()
+# bump whenever the upserted record layout changes so the next ingest rewrites every vector
+RECORD_SCHEMA = "2:topic-filter"
+# seconds (connect, read) for Endee REST calls; the health check gets no retries and a short
+# timeout because its first run blocks the page render
+ENDEE_TIMEOUT  = (5, 30)
+HEALTH_TIMEOUT = (2, 3)
+# upper bound on over-fetching when a backend cannot filter server-side
+MAX_OVERFETCH = 512
+# index objects whose backend rejected a metadata filter; they go straight to over-fetching
+FILTER_UNSUPPORTED = set()
+
+# comma-separated JSONL / CSV / Parquet files holding the Q&A bank
+CORPUS_PATHS = [p.strip() for p in get_secret("CORPUS_PATHS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "placement_kb.jsonl")).split(",") if p.strip()]
+# answers longer than this are split into several chunks (0 disables chunking)
+CHUNK_CHARS = int(get_secret("CORPUS_CHUNK_CHARS", 1200))
+BROWSE_PAGE_SIZE = 50
+# "vector", "lexical" (BM25 only) or "hybrid" (reciprocal rank fusion of both)
+RETRIEVAL_MODE = get_secret("RETRIEVAL_MODE", "hybrid").lower()
+LEXICAL_INDEX_PATH = get_secret("LEXICAL_INDEX_PATH", os.path.join(".cache", "lexical_index.npz"))
+LEXICAL_FAST_PATH_TERMS  = 4
+# BM25 floor for the fast path; one rare term in a question scores about 3-4
+LEXICAL_FAST_PATH_MIN_SCORE = 6.0
+
+EMBED_MODELS = ["models/text-embedding-004", "models/embedding-001", "models/text-multilingual-embedding-002"]
+
+@st.cache_resource
+def get_embedding_cache():
+    # one cache per process, shared across reruns and sessions
+    return EmbeddingCache(get_secret("EMBED_CACHE_PATH", os.path.join(".cache", "embeddings.sqlite3")))
+
+def embed_with_model(client, model, texts):
+    with METRICS.span("embed"):
+        result = client.models.embed_content(model=model, contents=texts)
+    embeddings = [e.values for e in result.embeddings]
+    if len(embeddings) != len(texts):
+        raise Exception(f"{model} returned {len(embeddings)} embeddings for {len(texts)} texts")
+    return embeddings
+
+def model_unavailable(error):
+    # the model is gone or cannot embed; anything else (429, 5xx, timeouts) is retried as is
+    if isinstance(error, genai_errors.APIError):
+        return error.code == 404 or (error.code == 400 and "not supported" in (error.message or "").lower())
+    return False
+
+def get_embeddings(texts, cache=None):
+    # one batched request for every text not already in the cache; an empty cache is falsy
+    # (it has a __len__), hence the None check
+    cache = cache if cache is not None else get_embedding_cache()
+    model = cache.resolved_model()
+    results = [None] * len(texts)
+    missing = list(range(len(texts)))
+    if model:
+        missing = []
+        for i, text in enumerate(texts):
+            cached = cache.get(model, text)
+            if cached is None:
+                missing.append(i)
+            else:
+                results[i] = cached
+        METRICS.count("embed.cache_hits", len(texts) - len(missing))
+        if not missing:
+            return results
+    METRICS.count("embed.cache_misses", len(missing))
+    todo = [texts[i] for i in missing]
+    client = get_genai_client()
+    embeddings = None
+    if model:
+        try:
+            cache.record_api_call()
+            embeddings = embed_with_model(client, model, todo)
+            if embeddings and not cache.resolved_dimension():
+                cache.set_resolved_model(model, len(embeddings[0]))  # memo written before dimensions were recorded
+        except Exception as e:
+            if not model_unavailable(e):
+                raise
+            # the remembered model was retired; fall back to discovery below
+            cache.clear_resolved_model()
+    if embeddings is None:
+        # vectors already stored were made at this dimension; a model with another one cannot replace it
+        dimension = cache.resolved_dimension()
+        try:
+            available = [m.name for m in client.models.list() if "embed" in m.name.lower()]
+        except Exception:
+            available = []
+        skipped = []
+        for model in dict.fromkeys(available + EMBED_MODELS):
+            try:
+                cache.record_api_call()
+                candidate = embed_with_model(client, model, todo)
+            except Exception as e:
+                if model_unavailable(e):
+                    continue
+                raise
+            if dimension and len(candidate[0]) != dimension:
+                skipped.append(f"{model} ({len(candidate[0])})")
+                continue
+            embeddings = candidate
+            cache.set_resolved_model(model, len(candidate[0]))
+            break
+        if embeddings is None and skipped:
+            raise Exception(f"No embedding model with the indexed dimension {dimension} is available (found {', '.join(skipped)}). "
+                            "Delete the embedding cache (EMBED_CACHE_PATH) and re-ingest to switch models.")
+    if embeddings is None:
+        raise Exception("No embedding model available. Check your Gemini API key.")
+    cache.put_many(model, todo, embeddings)
+    for i, embedding in zip(missing, embeddings):
+        results[i] = embedding
+    return results
+
+def get_embedding(text):
+    return get_embeddings([text])[0]
+
+@st.cache_resource
+def get_corpus_catalog():
+    return CorpusCatalog(get_secret("CORPUS_CATALOG_PATH", os.path.join(".cache", "corpus.sqlite3")))
+
+def load_corpus():
+    # a stat() per source file on each run; the catalog is rebuilt only when a file changed
+    catalog = get_corpus_catalog()
+    catalog.sync(CORPUS_PATHS, max_chars=CHUNK_CHARS)
+    return catalog
+
+@st.cache_resource
+def get_ingest_manifest():
+    return IngestManifest(get_secret("INGEST_MANIFEST_PATH", os.path.join(".cache", "ingest_manifest.sqlite3")))
+
+@st.cache_resource
+def get_answer_cache():
+    return SemanticAnswerCache(
+        max_entries=int(get_secret("ANSWER_CACHE_SIZE", 256)),
+        ttl=float(get_secret("ANSWER_CACHE_TTL", 3600)),
+        threshold=float(get_secret("ANSWER_CACHE_THRESHOLD", 0.95)),
+    )
+
+@st.cache_resource
+def get_lexical_index():
+    return BM25Index.load(LEXICAL_INDEX_PATH)
+
+@st.cache_resource
+def get_endee_client():
+    # one SDK client (and its pooled session) per process instead of one per call
+    client = Endee(endee_token if endee_token else "")
+    client.set_base_url(f"{endee_url.rstrip('/')}/api/v1")
+    return client
+
+@st.cache_resource
+def get_http_session(retries=3):
+    # keep-alive session for the Endee REST calls the SDK does not cover, one per retry policy
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=Retry(total=retries, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Content-Type"] = "application/json"
+    if endee_token:
+        session.headers["Authorization"] = endee_token
+    return session
+
+@st.cache_resource
+def get_genai_client():
+    return genai.Client(api_key=gemini_key)
+
+def index_names(data):
+    if isinstance(data, list):
+        return [i.get("name") for i in data]
+    if isinstance(data, dict):
+        return [i.get("name") for i in data.get("indexes", [])]
+    return []
+
+@st.cache_resource
+def get_health_monitor():
+    session = get_http_session(retries=0)
+
+    def list_endee_indexes():
+        r = session.get(f"{endee_url.rstrip('/')}/api/v1/index/list", timeout=HEALTH_TIMEOUT)
+        r.raise_for_status()
+        return index_names(r.json())
+
+    return HealthMonitor({"endee": list_endee_indexes}, ttl=float(get_secret("HEALTH_TTL", 15)))
+
+@st.cache_resource
+def get_local_index():
+    # loaded from disk (memory-mapped) once per process, so startup never re-embeds
+    return LocalIndex.load(get_secret("LOCAL_INDEX_DIR", os.path.join(".cache", "local_index")), dtype=get_secret("LOCAL_INDEX_DTYPE", "float16"))
+
+def endee_healthy():
+    return bool(endee_url) and get_health_monitor().get("endee")[0]
+
+def get_vector_index():
+    # "local" always uses the in-process index; "auto" falls back to it when Endee is unreachable
+    if VECTOR_BACKEND == "local" or (VECTOR_BACKEND == "auto" and not endee_healthy()):
+        return get_local_index()
+    return get_endee_client().get_index(name=INDEX_NAME)
+
+def prepare_endee_index(embedding_dim):
+    # returns the Endee index handle and whether it had to be created
+    session = get_http_session()
+    list_r = session.get(f"{endee_url.rstrip('/')}/api/v1/index/list", timeout=ENDEE_TIMEOUT)
+    existing = index_names(list_r.json()) if list_r.ok else []
+    if INDEX_NAME not in existing:
+        cr = session.post(f"{endee_url.rstrip('/')}/api/v1/index/create",
+            json={"name": INDEX_NAME, "dimension": embedding_dim, "space_type": "cosine", "precision": "float16"}, timeout=ENDEE_TIMEOUT)
+        if not cr.ok:
+            raise Exception(f"Index creation failed: {cr.text}")
+    client = get_endee_client()
+    return client.get_index(name=INDEX_NAME), INDEX_NAME not in existing
+
+def delete_endee_vectors(index, ids):
+    for item_id in ids:
+        try:
+            # ids are put in the URL path and chunk ids contain "#"
+            index.delete_vector(quote(item_id, safe=""))
+        except NotFoundException:
+            pass  # already gone, e.g. deleted by a run that crashed before updating the manifest
+
+def ingest_knowledge_base(on_event=None):
+    # on_event receives ingest_pipeline.IngestEvent progress updates
+    corpus = load_corpus()
+    first  = corpus.first()
+    if first is None:
+        raise Exception(f"The question bank is empty ({', '.join(CORPUS_PATHS)})")
+    try:
+        embedding_dim = len(get_embedding(item_text(first)))
+    except Exception as e:
+        raise Exception(f"Failed to get embedding: {e}")
+    manifest = get_ingest_manifest()
+    # (manifest key, upsert, delete, starts empty, manifest, checkpoint signature) for every
+    # backend that should receive the corpus. Endee persists each upsert, so its progress is
+    # checkpointed; the local index is only durable once saved, so its marks wait for the save.
+    targets = []
+    if VECTOR_BACKEND != "local":
+        try:
+            index, created = prepare_endee_index(embedding_dim)
+            targets.append((INDEX_NAME, index.upsert, lambda ids: delete_endee_vectors(index, ids), created, manifest, corpus.signature))
+        except Exception:
+            if VECTOR_BACKEND == "endee":
+                raise
+    local_index = local_manifest = None
+    if VECTOR_BACKEND != "endee":
+        local_index = get_local_index()
+        local_manifest = DeferredManifest(manifest)
+        targets.append((f"local:{INDEX_NAME}", local_index.upsert, local_index.delete, len(local_index) == 0, local_manifest, None))
+    cache = get_embedding_cache()
+
+    def embed_batch(texts):
+        with METRICS.span("ingest.embed_batch"):
+            return get_embeddings(texts, cache=cache)
+
+    def timed_upsert(upsert):
+        def run(records):
+            with METRICS.span("ingest.upsert"):
+                return upsert(records)
+        return run
+
+    results = []
+    for manifest_key, upsert, delete, fresh, target_manifest, signature in targets:
+        if fresh:
+            # a fresh index holds none of the previously recorded items
+            manifest.clear(manifest_key)
+        stats = run_ingest(
+            corpus.iter_items(), manifest_key,
+            embed_batch=embed_batch,
+            upsert=timed_upsert(upsert),
+            manifest=target_manifest,
+            to_record=lambda item, vector: {"id": item["id"], "vector": vector, "filter": {"topic": item["topic"]}, "meta": {"topic": item["topic"], "question": item["question"], "answer": item["answer"]}},
+            batch_size=int(get_secret("INGEST_BATCH_SIZE", 50)),
+            max_workers=int(get_secret("INGEST_WORKERS", 4)),
+            rate_limit=float(get_secret("EMBED_RATE_LIMIT", 10)),
+            on_event=on_event,
+            salt=RECORD_SCHEMA,
+            total=len(corpus),
+            signature=signature,
+        )
+        # items removed from the corpus, or re-chunked under new ids, must not keep being cited
+        stats["deleted"] = prune_removed(manifest_key, target_manifest, corpus.missing, delete)
+        results.append(stats)
+    if local_index is not None:
+        local_index.save()
+        local_manifest.commit()
+    lexical_index = get_lexical_index()
+    lexical_changed = lexical_index.upsert(corpus.iter_items())
+    lexical_changed += lexical_index.delete(corpus.missing(lexical_index.ids()))
+    if lexical_changed:
+        lexical_index.save(LEXICAL_INDEX_PATH)
+    if VECTOR_BACKEND != "local" and endee_url:
+        # pick up a newly created index on the next render
+        get_health_monitor().refresh("endee")
+    if any(r["upserted"] or r["deleted"] for r in results):
+        # the corpus changed, so cached answers may cite stale or missing sources
+        get_answer_cache().invalidate()
+    METRICS.count("ingest.embedded", sum(r["embedded"] for r in results))
+    METRICS.count("ingest.upserted", sum(r["upserted"] for r in results))
+    METRICS.count("ingest.deleted", sum(r["deleted"] for r in results))
+    # report the primary backend; later targets are served from the embedding cache
+    return results[0]
+
+def search_index(index, query_vec, topic_filter, top_k):
+    with METRICS.span("vector_query"):
+        return query_index(index, query_vec, topic_filter, top_k)
+
+def query_index(index, query_vec, topic_filter, top_k):
+    if topic_filter == "All Topics":
+        return index.query(vector=query_vec, top_k=top_k)
+    if id(index) in FILTER_UNSUPPORTED:
+        return overfetch_topic(index, query_vec, topic_filter, top_k)
+    try:
+        # an empty result is an answer (nothing on-topic), not a reason to fall back
+        return index.query(vector=query_vec, top_k=top_k, filter=[{"topic": {"$eq": topic_filter}}])
+    except (APIException, TypeError):
+        # a 400, or a client without a filter argument. It is the filter only if the same query
+        # succeeds without one; otherwise (a bad vector, say) that error propagates and the index
+        # keeps filtering server-side. Timeouts and server errors are not caught at all
+        results = overfetch_topic(index, query_vec, topic_filter, top_k)
+        FILTER_UNSUPPORTED.add(id(index))
+        return results
+
+def overfetch_topic(index, query_vec, topic_filter, top_k):
+    # last resort for servers without filter support: over-fetch and post-filter, widening the
+    # window until top_k on-topic hits
+    fetch = min(top_k * 4, MAX_OVERFETCH)
+    while True:
+        results  = index.query(vector=query_vec, top_k=fetch)
+        on_topic = [r for r in results if r.get("meta", {}).get("topic") == topic_filter]
+        if len(on_topic) >= top_k or len(results) < fetch or fetch >= MAX_OVERFETCH:
+            return on_topic[:top_k]
+        fetch = min(fetch * 4, MAX_OVERFETCH)
+
+@st.cache_data(ttl=int(get_secret("GEN_MODEL_TTL", 3600)), show_spinner=False)
+def resolve_generation_model():
+    # picked once per process (refreshed after the TTL) instead of listing models on every question
+    ai = get_genai_client()
+    try:
+        available = [m.name for m in ai.models.list()]
+    except Exception:
+        available = []
+    gen_model = "gemini-1.5-flash"
+    for pref in ["gemini-1.5-flash", "gemini-1.5-pro", "gemini-2.0-flash", "gemini-2.5"]:
+        for m in available:
+            if pref in m and "embed" not in m:
+                gen_model = m
+                break
+    return gen_model
+
+def timed_generation_model():
+    with METRICS.span("model_resolution"):
+        return resolve_generation_model()
+
+def call_generation_model(fn):
+    try:
+        return fn(timed_generation_model())
+    except Exception:
+        # the cached model may have been retired; pick again once before giving up
+        resolve_generation_model.clear()
+        return fn(timed_generation_model())
+
+def lexical_search(question, topic_filter, top_k):
+    with METRICS.span("lexical_query"):
+        return get_lexical_index().search(question, top_k=max(top_k, 10), topic=None if topic_filter == "All Topics" else topic_filter)
+
+def confident_hit(hit):
+    return hit["coverage"] == 1.0 and hit["score"] >= LEXICAL_FAST_PATH_MIN_SCORE
+
+def lexical_fast_path(question, lexical, top_k):
+    # a short keyword question of at least two terms whose best hit is a question containing all
+    # of them, with a high score, is answered from the lexical index without an embedding call.
+    # Returns the confident hits as a (possibly short) context, or [] to fall back to vector
+    # search; hits that only share a filler word ("explain") are never used, and a single
+    # term ("pointer") matches too loosely
+    terms = set(tokenize(question))
+    if not lexical or not 2 <= len(terms) <= LEXICAL_FAST_PATH_TERMS or not confident_hit(lexical[0]):
+        return []
+    return [hit for hit in lexical if confident_hit(hit)][:top_k]
+
+def retrieve(question, topic_filter, top_k, query_vec=None, mode=None, lexical=None):
+    mode = mode or RETRIEVAL_MODE
+    if lexical is None and mode != "vector":
+        lexical = lexical_search(question, topic_filter, top_k)
+    # the score shown per source: BM25 relative to the best hit, cosine similarity, or the fused
+    # RRF score, since the first two are on different scales
+    fast = lexical_fast_path(question, lexical, top_k) if mode == "hybrid" and query_vec is None else []
+    if mode == "lexical" or fast:
+        METRICS.count("retrieve.lexical_only")
+        results, score_key, score_type = fast or lexical, "similarity", "BM25"
+    else:
+        query_vec = query_vec if query_vec is not None else get_embedding(question)
+        results   = search_index(get_vector_index(), query_vec, topic_filter, top_k)
+        score_key, score_type = "similarity", "cosine"
+        if mode == "hybrid":
+            results = rrf_fuse([results, lexical], top_k)
+            score_key, score_type = "rrf", "RRF"
+    results = results[:top_k]
+    sources = []
+    for r in results:
+        meta = r.get("meta", {})
+        sources.append({"topic": meta.get("topic",""), "question": meta.get("question",""), "score": round(r.get(score_key, 0), 4), "score_type": score_type})
+    return results, sources
+
+def build_prompt(question, results):
+    with METRICS.span("prompt_build"):
+        return format_prompt(question, results)
+
+def format_prompt(question, results):
+    context_parts = []
+    for r in results:
+        meta = r.get("meta", {})
+        context_parts.append(f"Q: {meta.get('question','')}\nA: {meta.get('answer','')}")
+    context = "\n\n---\n\n".join(context_parts)
+    return f"You are an expert placement preparation coach. Use the retrieved knowledge to answer the student's question.\n\nRetrieved Context:\n{context}\n\nStudent Question: {question}\n\nProvide a clear structured answer with bullet points where helpful."
+
+def lookup_answer(question, topic_filter, top_k):
+    # returns (cached entry or None, how it matched, query embedding or None, lexical hits or None);
+    # the embedding is skipped when the lexical fast path will answer the question anyway
+    cache = get_answer_cache()
+    entry = cache.lookup_exact(question, topic_filter, top_k)
+    if entry is not None:
+        METRICS.count("answer_cache.exact_hits")
+        return entry, "exact", None, None
+    lexical = lexical_search(question, topic_filter, top_k) if RETRIEVAL_MODE != "vector" else None
+    if RETRIEVAL_MODE == "lexical" or (RETRIEVAL_MODE == "hybrid" and lexical_fast_path(question, lexical, top_k)):
+        return None, None, None, lexical
+    query_vec = get_embedding(question)
+    entry = cache.lookup_similar(query_vec, topic_filter, top_k)
+    METRICS.count("answer_cache.semantic_hits" if entry is not None else "answer_cache.misses")
+    return entry, "semantic" if entry is not None else None, query_vec, lexical
+
+def generate(ai, model, prompt):
+    with METRICS.span("generation"):
+        return ai.models.generate_content(model=model, contents=prompt)
+
+def rag_query(question, topic_filter, top_k):
+    with METRICS.span("rag_total"):
+        cached, _, query_vec, lexical = lookup_answer(question, topic_filter, top_k)
+        if cached is not None:
+            return cached["answer"], cached["sources"]
+        results, sources = retrieve(question, topic_filter, top_k, query_vec=query_vec, lexical=lexical)
+        prompt   = build_prompt(question, results)
+        ai       = get_genai_client()
+        response = call_generation_model(lambda model: generate(ai, model, prompt))
+        get_answer_cache().put(question, topic_filter, top_k, query_vec, response.text, sources)
+        return response.text, sources
+
+def rag_query_stream(question, topic_filter, top_k):
+    # returns sources as soon as retrieval finishes, plus a generator of answer text chunks;
+    # timing["ttft"] and timing["total"] are filled in (seconds) as the generator is consumed
+    started = time.perf_counter()
+    cached, match, query_vec, lexical = lookup_answer(question, topic_filter, top_k)
+    if cached is not None:
+        elapsed = time.perf_counter() - started
+        METRICS.observe("rag_total", elapsed * 1000)
+        return cached["sources"], iter([cached["answer"]]), {"retrieval": elapsed, "ttft": elapsed, "total": elapsed, "cached": match}
+    results, sources = retrieve(question, topic_filter, top_k, query_vec=query_vec, lexical=lexical)
+    timing  = {"retrieval": time.perf_counter() - started, "ttft": None, "total": None, "cached": None}
+    prompt  = build_prompt(question, results)
+    ai      = get_genai_client()
+
+    def open_stream(model):
+        # the request is only sent on first iteration, so pull one chunk inside the retry
+        timing["generation_started"] = time.perf_counter()
+        stream = iter(ai.models.generate_content_stream(model=model, contents=prompt))
+        return stream, next(stream, None)
+
+    def tokens():
+        stream, first = call_generation_model(open_stream)
+        parts = []
+        for chunk in itertools.chain([first] if first is not None else [], stream):
+            if chunk.text:
+                if timing["ttft"] is None:
+                    timing["ttft"] = time.perf_counter() - started
+                    METRICS.observe("ttft", timing["ttft"] * 1000)
+                parts.append(chunk.text)
+                yield chunk.text
+        finished = time.perf_counter()
+        timing["total"] = finished - started
+        # streamed generation includes the time the consumer spends rendering each chunk
+        METRICS.observe("generation", (finished - timing.pop("generation_started")) * 1000)
+        METRICS.observe("rag_total", timing["total"] * 1000)
+        # only complete answers are cached
+        get_answer_cache().put(question, topic_filter, top_k, query_vec, "".join(parts), sources)
+
+    return sources, tokens(), timing
+
+EVAL_TEMPLATES = ["Can you explain {}?", "I need help understanding {}", "{} - how would you put it in an interview?"]
+
+def reword_question(question, rng):
+    # the content words reordered, one dropped, in a new frame: the verbatim question (which BM25
+    # indexes twice) would favour lexical retrieval by construction
+    words = tokenize(question)
+    if len(words) > 2:
+        words.pop(rng.randrange(len(words)))
+    rng.shuffle(words)
+    return rng.choice(EVAL_TEMPLATES).format(" ".join(words))
+
+def evaluate_retrieval(sample_size=20, top_k=5):
+    # reworded corpus questions as queries: a hit is the item (or a chunk of it) the question came from
+    rng = random.Random(0)
+    queries = {}
+    for item in load_corpus().iter_items():
+        gold = item.get("parent_id", item["id"])
+        if gold not in queries:
+            queries[gold] = reword_question(item["question"], rng)
+            if len(queries) >= sample_size:
+                break
+    # every query is embedded once up front, so no mode pays for (or profits from the cache
+    # warmed by) another mode's embedding calls; that cost is reported as its own column and is
+    # near zero when the embedding cache already holds the queries
+    vectors, embed_ms = {}, []
+    for gold, query in queries.items():
+        started = time.perf_counter()
+        vectors[gold] = get_embedding(query)
+        embed_ms.append((time.perf_counter() - started) * 1000)
+    rows = []
+    for mode in ("vector", "lexical", "hybrid"):
+        latencies, hits, reciprocal_ranks = [], 0, 0.0
+        for gold, query in queries.items():
+            started = time.perf_counter()
+            lexical = lexical_search(query, "All Topics", top_k) if mode != "vector" else None
+            # hybrid keeps its fast path: the precomputed vector is only used where retrieve would embed
+            needs_vector = mode == "vector" or (mode == "hybrid" and not lexical_fast_path(query, lexical, top_k))
+            results, _ = retrieve(query, "All Topics", top_k, query_vec=vectors[gold] if needs_vector else None, mode=mode, lexical=lexical)
+            latencies.append((time.perf_counter() - started) * 1000)
+            ranks = [i for i, r in enumerate(results) if r["id"].split("#")[0] == gold]
+            if ranks:
+                hits += 1
+                reciprocal_ranks += 1 / (ranks[0] + 1)
+        latencies.sort()
+        rows.append({"mode": mode, f"hit@{top_k}": round(hits / len(queries), 3), "MRR": round(reciprocal_ranks / len(queries), 3),
+                     "mean ms": round(sum(latencies) / len(latencies), 2), "p95 ms": round(latencies[int(0.95 * (len(latencies) - 1))], 2),
+                     "embed ms": None if mode == "lexical" else round(sum(embed_ms) / len(embed_ms), 2)})
+    return rows
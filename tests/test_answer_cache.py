@@ -0,0 +1,77 @@
+import pytest
+
+import answer_cache
+from answer_cache import SemanticAnswerCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def put(cache, question, embedding, answer="answer", topic="All Topics", top_k=5):
+    cache.put(question, topic, top_k, embedding, answer, [{"question": question}])
+
+
+def test_exact_hit_needs_no_embedding():
+    cache = SemanticAnswerCache()
+    put(cache, "What is a deadlock?", None, "Circular wait.")
+    entry = cache.lookup_exact("  what is a   DEADLOCK? ", "All Topics", 5)
+    assert entry["answer"] == "Circular wait."
+    assert cache.lookup_exact("What is a deadlock?", "OS", 5) is None
+    assert cache.lookup_exact("What is a deadlock?", "All Topics", 3) is None
+    assert cache.stats["exact_hits"] == 1
+
+
+def test_similarity_threshold():
+    cache = SemanticAnswerCache(threshold=0.95)
+    put(cache, "What is a deadlock?", [1.0, 0.0], "Circular wait.")
+    hit = cache.lookup_similar([0.99, 0.05], "All Topics", 5)
+    assert hit["answer"] == "Circular wait." and hit["similarity"] >= 0.95
+    assert cache.lookup_similar([0.8, 0.6], "All Topics", 5) is None
+    # same direction, other topic filter or top_k
+    assert cache.lookup_similar([1.0, 0.0], "OS", 5) is None
+    assert cache.lookup_similar([1.0, 0.0], "All Topics", 3) is None
+    assert cache.stats["semantic_hits"] == 1 and cache.stats["misses"] == 3
+
+
+def test_entries_without_embedding_only_match_exactly():
+    cache = SemanticAnswerCache()
+    put(cache, "TCP vs UDP", None)
+    assert cache.lookup_similar([1.0, 0.0], "All Topics", 5) is None
+
+
+def test_ttl_expiry(clock):
+    cache = SemanticAnswerCache(ttl=60)
+    put(cache, "What is a deadlock?", [1.0, 0.0])
+    clock[0] += 59
+    assert cache.lookup_exact("What is a deadlock?", "All Topics", 5) is not None
+    clock[0] += 2
+    assert cache.lookup_exact("What is a deadlock?", "All Topics", 5) is None
+    assert cache.lookup_similar([1.0, 0.0], "All Topics", 5) is None
+    assert len(cache) == 0
+
+
+def test_lru_bound():
+    cache = SemanticAnswerCache(max_entries=2)
+    put(cache, "q1", [1.0, 0.0])
+    put(cache, "q2", [0.0, 1.0])
+    # touching q1 makes q2 the least recently used
+    assert cache.lookup_exact("q1", "All Topics", 5) is not None
+    put(cache, "q3", [0.7, 0.7])
+    assert len(cache) == 2
+    assert cache.lookup_exact("q2", "All Topics", 5) is None
+    assert cache.lookup_exact("q1", "All Topics", 5) is not None
+    assert cache.lookup_exact("q3", "All Topics", 5) is not None
+
+
+def test_invalidate():
+    cache = SemanticAnswerCache()
+    put(cache, "q1", [1.0, 0.0])
+    put(cache, "q2", None)
+    cache.invalidate()
+    assert len(cache) == 0
+    assert cache.lookup_exact("q2", "All Topics", 5) is None
+    assert cache.lookup_similar([1.0, 0.0], "All Topics", 5) is None
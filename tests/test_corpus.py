@@ -0,0 +1,117 @@
+import json
+import os
+
+import pytest
+
+from corpus import CorpusCatalog, chunk_item, iter_records
+
+
+def sentence(n, char):
+    # n characters ending in a full stop
+    return char * (n - 1) + "."
+
+
+def item(answer, item_id="q1"):
+    return {"id": item_id, "topic": "OS", "question": "What is paging?", "answer": answer}
+
+
+def test_short_answer_is_not_chunked():
+    assert list(chunk_item(item("Short answer."), max_chars=100)) == [item("Short answer.")]
+    long = item(" ".join([sentence(80, "a")] * 3))
+    assert list(chunk_item(long, max_chars=0)) == [long]
+
+
+def test_chunks_keep_question_and_parent():
+    chunks = list(chunk_item(item(" ".join([sentence(60, "a"), sentence(60, "b")])), max_chars=100))
+    assert [c["id"] for c in chunks] == ["q1#1", "q1#2"]
+    assert all(c["question"] == "What is paging?" and c["parent_id"] == "q1" for c in chunks)
+
+
+def test_overlap_sentence_is_carried_when_it_fits():
+    a, b, c = sentence(30, "a"), sentence(40, "b"), sentence(50, "c")
+    chunks = [ch["answer"] for ch in chunk_item(item(" ".join([a, b, c])), max_chars=100)]
+    assert chunks == [f"{a} {b}", f"{b} {c}"]
+
+
+def test_overlap_sentence_is_dropped_when_it_cannot_fit():
+    a, b, c = sentence(41, "a"), sentence(81, "b"), sentence(81, "c")
+    chunks = [ch["answer"] for ch in chunk_item(item(" ".join([a, b, c])), max_chars=100)]
+    assert chunks == [a, b, c]
+    assert all(len(ch) <= 100 for ch in chunks)
+
+
+def test_chunks_stay_within_limit():
+    sentences = [sentence(n, "abcdefgh"[n % 8]) for n in (12, 47, 33, 58, 21, 64, 9, 40, 55, 30)]
+    chunks = [ch["answer"] for ch in chunk_item(item(" ".join(sentences)), max_chars=90)]
+    assert all(len(ch) <= 90 for ch in chunks)
+    # every sentence survives, in order, once overlaps are dropped
+    assert list(dict.fromkeys(s for ch in chunks for s in ch.split(" "))) == sentences
+
+
+def write_jsonl(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def records(n, topic="OS"):
+    return [{"id": f"{topic}{i}", "topic": topic, "question": f"{topic} question {i}?", "answer": f"Answer {i}."} for i in range(n)]
+
+
+@pytest.fixture
+def bank(tmp_path):
+    path = str(tmp_path / "bank.jsonl")
+    write_jsonl(path, records(5, "OS") + records(3, "DBMS") + [
+        {"id": "long", "topic": "DBMS", "question": "Explain indexing", "answer": " ".join([sentence(60, "x"), sentence(60, "y")])}])
+    return path
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return CorpusCatalog(str(tmp_path / "catalog.sqlite3"))
+
+
+def test_iter_records_fills_missing_ids(tmp_path):
+    path = str(tmp_path / "bank.jsonl")
+    write_jsonl(path, [{"topic": "OS", "question": "Q?", "answer": "A."}])
+    assert next(iter_records(path))["id"].startswith("q_")
+    write_jsonl(path, [{"topic": "OS", "question": "Q?"}])
+    with pytest.raises(ValueError, match="missing answer"):
+        list(iter_records(path))
+
+
+def test_sync_rebuilds_only_on_signature_change(catalog, bank):
+    assert catalog.sync([bank], max_chars=100) is True
+    assert catalog.sync([bank], max_chars=100) is False
+    assert len(catalog) == 10 and catalog.source_count() == 9
+
+    # a different chunk size changes the signature
+    assert catalog.sync([bank], max_chars=0) is True
+    assert len(catalog) == 9
+
+    write_jsonl(bank, records(2, "OS"))
+    os.utime(bank, ns=(0, 1))
+    assert catalog.sync([bank], max_chars=0) is True
+    assert len(catalog) == catalog.source_count() == 2
+    assert catalog.topic_counts() == {"OS": 2}
+
+
+def test_topic_counts_and_paging_count_whole_qas(catalog, bank):
+    catalog.sync([bank], max_chars=100)
+    assert catalog.topic_counts() == {"OS": 5, "DBMS": 4}
+    first = catalog.by_topic("OS", limit=2)
+    second = catalog.by_topic("OS", limit=2, offset=2)
+    last = catalog.by_topic("OS", limit=2, offset=4)
+    assert [i["id"] for i in first + second + last] == ["OS0", "OS1", "OS2", "OS3", "OS4"]
+    assert catalog.by_topic("OS", limit=2, offset=6) == []
+    assert [i["id"] for i in catalog.by_topic("DBMS")] == ["DBMS0", "DBMS1", "DBMS2", "long"]
+    assert "parent_id" not in catalog.by_topic("DBMS")[-1]
+
+
+def test_missing_and_get(catalog, bank):
+    catalog.sync([bank], max_chars=100)
+    assert catalog.missing(["OS0", "long#1", "long#2", "long", "gone"]) == ["long", "gone"]
+    assert catalog.missing([f"x{i}" for i in range(1200)] + ["OS1"]) == [f"x{i}" for i in range(1200)]
+    assert catalog.get("long#2")["parent_id"] == "long"
+    assert catalog.get("gone") is None
+    assert [i["id"] for i in catalog.iter_items(batch_size=3)][:6] == ["OS0", "OS1", "OS2", "OS3", "OS4", "DBMS0"]
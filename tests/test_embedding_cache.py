@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import pytest
+from google.genai import errors
+
+import rag
+from embedding_cache import EmbeddingCache
+
+PRIMARY = "models/text-embedding-004"
+
+
+def api_error(code, message):
+    return errors.ClientError(code, {"error": {"code": code, "message": message, "status": "ERROR"}})
+
+
+class FakeModels:
+    # embed_content returns vectors of dimensions[model]; failures[model] is raised instead
+    def __init__(self, dimensions):
+        self.dimensions = dimensions
+        self.failures = {}
+        self.calls = []
+
+    def list(self):
+        return [SimpleNamespace(name=name) for name in self.dimensions]
+
+    def embed_content(self, model, contents):
+        self.calls.append(model)
+        if model in self.failures:
+            raise self.failures[model]
+        if model not in self.dimensions:
+            raise api_error(404, f"{model} is not found")
+        return SimpleNamespace(embeddings=[SimpleNamespace(values=[float(len(text))] * self.dimensions[model]) for text in contents])
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+
+
+@pytest.fixture
+def models(monkeypatch):
+    models = FakeModels({PRIMARY: 4})
+    monkeypatch.setattr(rag, "get_genai_client", lambda: SimpleNamespace(models=models))
+    return models
+
+
+def test_cache_round_trip(cache, tmp_path):
+    cache.put_many("m", ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+    assert cache.get("m", "a") == [1.0, 2.0]
+    assert cache.get("other", "a") is None
+    reopened = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    assert reopened.get("m", "b") == [3.0, 4.0]
+    assert reopened.stats["disk_hits"] == 1 and len(reopened) == 2
+
+
+def test_resolved_model_and_dimension_persist(cache, tmp_path):
+    cache.set_resolved_model(PRIMARY, 768)
+    cache.clear_resolved_model()
+    reopened = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"))
+    assert reopened.resolved_model() is None
+    assert reopened.resolved_dimension() == 768
+
+
+def test_resolved_model_is_reused(cache, models):
+    assert rag.get_embeddings(["a", "bb"], cache=cache) == [[1.0] * 4, [2.0] * 4]
+    assert cache.resolved_model() == PRIMARY and cache.resolved_dimension() == 4
+    models.calls.clear()
+    assert rag.get_embeddings(["a", "ccc"], cache=cache) == [[1.0] * 4, [3.0] * 4]
+    # one call for the uncached text, straight to the remembered model
+    assert models.calls == [PRIMARY]
+
+
+@pytest.mark.parametrize("error", [api_error(429, "Resource exhausted"), api_error(500, "Internal error"), TimeoutError("read timed out")])
+def test_transient_errors_keep_the_resolved_model(cache, models, error):
+    rag.get_embeddings(["a"], cache=cache)
+    models.failures[PRIMARY] = error
+    models.calls.clear()
+    with pytest.raises(type(error)):
+        rag.get_embeddings(["b"], cache=cache)
+    assert models.calls == [PRIMARY]
+    assert cache.resolved_model() == PRIMARY
+
+
+@pytest.mark.parametrize("error", [api_error(404, "models/text-embedding-004 is not found"),
+                                   api_error(400, "embedContent is not supported for this model")])
+def test_unavailable_model_is_replaced(cache, models, error):
+    rag.get_embeddings(["a"], cache=cache)
+    models.dimensions["models/embedding-001"] = 4
+    models.failures[PRIMARY] = error
+    assert rag.get_embeddings(["b"], cache=cache) == [[1.0] * 4]
+    assert cache.resolved_model() == "models/embedding-001"
+
+
+def test_model_with_another_dimension_is_refused(cache, models):
+    rag.get_embeddings(["a"], cache=cache)
+    del models.dimensions[PRIMARY]
+    models.dimensions["models/gemini-embedding-001"] = 8
+    with pytest.raises(Exception, match="indexed dimension 4"):
+        rag.get_embeddings(["b"], cache=cache)
+    assert cache.resolved_model() is None and cache.resolved_dimension() == 4
+    assert cache.get("models/gemini-embedding-001", "b") is None
@@ -0,0 +1,149 @@
+import pytest
+
+import ingest_pipeline
+from ingest_pipeline import DeferredManifest, IngestManifest, prune_removed, run_ingest
+
+
+def make_items(n):
+    return [{"id": f"q{i}", "topic": "DBMS", "question": f"Question {i}?", "answer": f"Answer {i}."} for i in range(n)]
+
+
+def to_record(item, vector):
+    return {"id": item["id"], "vector": vector}
+
+
+class FakeBackend:
+    # records every embedded text and upserted id; fail_on_upsert makes that call (1-based) crash
+    def __init__(self, fail_on_upsert=None):
+        self.embedded = []
+        self.upserted = []
+        self.upsert_calls = 0
+        self.fail_on_upsert = fail_on_upsert
+
+    def embed_batch(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def upsert(self, records):
+        self.upsert_calls += 1
+        if self.upsert_calls == self.fail_on_upsert:
+            raise RuntimeError("connection reset")
+        self.upserted.extend(r["id"] for r in records)
+
+
+@pytest.fixture(autouse=True)
+def no_retry(monkeypatch):
+    # failures should surface at once instead of backing off
+    monkeypatch.setattr(ingest_pipeline, "with_retry", lambda fn: fn())
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return IngestManifest(str(tmp_path / "manifest.sqlite3"))
+
+
+def ingest(items, backend, manifest, **kwargs):
+    kwargs.setdefault("signature", "sig")
+    return run_ingest(iter(items), "idx", backend.embed_batch, backend.upsert, manifest, to_record,
+                      batch_size=2, upsert_chunk=2, max_workers=1, rate_limit=0, total=len(items), **kwargs)
+
+
+def test_skips_unchanged_items(manifest):
+    items = make_items(6)
+    first = ingest(items, FakeBackend(), manifest)
+    assert first["embedded"] == first["upserted"] == 6
+
+    backend = FakeBackend()
+    second = ingest(items, backend, manifest)
+    assert second["skipped"] == 6
+    assert second["embedded"] == second["upserted"] == 0
+    assert backend.embedded == [] and backend.upserted == []
+
+
+def test_reembeds_changed_items(manifest):
+    items = make_items(6)
+    ingest(items, FakeBackend(), manifest)
+    items[3] = dict(items[3], answer="A rewritten answer.")
+
+    backend = FakeBackend()
+    stats = ingest(items, backend, manifest)
+    assert stats["embedded"] == 1 and stats["skipped"] == 5
+    assert backend.upserted == ["q3"]
+
+
+def test_salt_change_reupserts_everything(manifest):
+    items = make_items(4)
+    ingest(items, FakeBackend(), manifest, salt="1")
+    stats = ingest(items, FakeBackend(), manifest, salt="2")
+    assert stats["upserted"] == 4
+
+
+def test_resumes_after_crash_from_last_flush(manifest):
+    items = make_items(10)
+    crashing = FakeBackend(fail_on_upsert=3)
+    with pytest.raises(RuntimeError):
+        ingest(items, crashing, manifest)
+    landed = len(crashing.upserted)
+    assert 0 < landed < 10
+    assert manifest.checkpoint("idx", "sig") == landed
+    assert manifest.checkpoint("idx", "other-corpus") == 0
+
+    events = []
+    backend = FakeBackend()
+    stats = ingest(items, backend, manifest, on_event=events.append)
+    assert events[0].stage == "resume" and events[0].done == landed
+    assert stats["resumed"] == landed
+    assert backend.upserted == [item["id"] for item in items[landed:]]
+    assert sorted(crashing.upserted + backend.upserted) == sorted(item["id"] for item in items)
+
+
+def test_checkpoint_reset_after_completed_run(manifest):
+    items = make_items(5)
+    ingest(items, FakeBackend(), manifest)
+    assert manifest.checkpoint("idx", "sig") == 0
+
+    items[0] = dict(items[0], answer="Edited after the run.")
+    backend = FakeBackend()
+    stats = ingest(items, backend, manifest)
+    # the next run starts from the top, so the edit to the first item is picked up
+    assert stats["resumed"] == 0
+    assert backend.upserted == ["q0"]
+
+
+def test_mismatched_vector_count_fails(manifest):
+    backend = FakeBackend()
+    backend.embed_batch = lambda texts: [[1.0, 0.0]]
+    with pytest.raises(Exception, match="returned 1 vectors for 2 items"):
+        ingest(make_items(2), backend, manifest)
+    assert manifest.stored_hashes("idx", ["q0", "q1"]) == {}
+
+
+def test_deferred_manifest_records_nothing_until_commit(manifest):
+    deferred = DeferredManifest(manifest)
+    ingest(make_items(4), FakeBackend(), deferred)
+    assert manifest.item_ids("idx") == []
+    deferred.commit()
+    assert sorted(manifest.item_ids("idx")) == ["q0", "q1", "q2", "q3"]
+
+
+def test_prune_removed_deletes_and_forgets_missing_items(manifest):
+    items = make_items(6)
+    ingest(items, FakeBackend(), manifest)
+    current = {"q0", "q2", "q4"}
+    deleted = []
+
+    removed = prune_removed("idx", manifest, lambda ids: [i for i in ids if i not in current], deleted.extend, batch_size=4)
+    assert removed == 3
+    assert sorted(deleted) == ["q1", "q3", "q5"]
+    assert sorted(manifest.item_ids("idx")) == ["q0", "q2", "q4"]
+    assert prune_removed("idx", manifest, lambda ids: [i for i in ids if i not in current], deleted.extend) == 0
+
+
+def test_prune_removed_keeps_manifest_when_delete_fails(manifest):
+    ingest(make_items(2), FakeBackend(), manifest)
+
+    def fail(ids):
+        raise RuntimeError("backend down")
+    with pytest.raises(RuntimeError):
+        prune_removed("idx", manifest, lambda ids: list(ids), fail)
+    assert sorted(manifest.item_ids("idx")) == ["q0", "q1"]
@@ -0,0 +1,109 @@
+import pytest
+
+from lexical_index import BM25Index, rrf_fuse, tokenize
+
+ITEMS = [
+    {"id": "q1", "topic": "DBMS", "question": "What is database normalization?", "answer": "Organizing tables to reduce redundancy."},
+    {"id": "q2", "topic": "DBMS", "question": "What is a deadlock in databases?", "answer": "Transactions waiting on each other's locks."},
+    {"id": "q3", "topic": "OS", "question": "What is a deadlock?", "answer": "Processes waiting forever for resources held by each other."},
+    {"id": "q4", "topic": "OS", "question": "Explain paging", "answer": "Memory is split into fixed-size pages mapped to frames."},
+    {"id": "q5", "topic": "Languages", "question": "Virtual functions in C++", "answer": "Dynamic dispatch through a vtable."},
+]
+
+
+@pytest.fixture
+def index():
+    index = BM25Index()
+    index.upsert(ITEMS)
+    return index
+
+
+def ids(hits):
+    return [h["id"] for h in hits]
+
+
+def test_tokenize_keeps_language_names():
+    assert tokenize("What is C++ vs C#?") == ["c++", "c#"]
+
+
+def test_search_ranks_question_matches_first(index):
+    hits = index.search("deadlock", top_k=5)
+    assert set(ids(hits)) == {"q2", "q3"}
+    assert hits[0]["similarity"] == 1.0
+    assert hits[0]["coverage"] == 1.0
+    assert index.search("c++ virtual", top_k=1)[0]["id"] == "q5"
+
+
+def test_search_topic_filter(index):
+    assert ids(index.search("deadlock", topic="OS")) == ["q3"]
+    assert index.search("deadlock", topic="Languages") == []
+    assert index.search("the of and") == []
+
+
+def test_upsert_skips_unchanged_and_replaces_changed(index):
+    assert index.upsert(ITEMS) == 0
+    assert index.upsert([dict(ITEMS[3], answer="Virtual memory in fixed-size blocks.")]) == 1
+    assert len(index) == 5
+    hits = index.search("blocks")
+    assert ids(hits) == ["q4"] and hits[0]["meta"]["answer"] == "Virtual memory in fixed-size blocks."
+    assert index.search("frames") == []
+
+
+def test_save_load_round_trip(index, tmp_path):
+    # the rewrite leaves a tombstone behind, which must stay dead after loading
+    index.upsert([dict(ITEMS[0], answer="Splitting tables into normal forms.")])
+    path = str(tmp_path / "lexical.npz")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert len(loaded) == len(index) == 5
+    for query in ("deadlock", "normal forms tables", "redundancy", "paging memory", "virtual c++"):
+        assert loaded.search(query, top_k=5) == index.search(query, top_k=5)
+    assert loaded.upsert(ITEMS) == 1
+
+
+def test_load_missing_file_is_empty(tmp_path):
+    index = BM25Index.load(str(tmp_path / "missing.npz"))
+    assert len(index) == 0 and index.search("deadlock") == []
+
+
+def test_compaction_drops_tombstones(index):
+    # rewriting two of five docs leaves 2 dead of 7, under the threshold; a third compacts
+    index.upsert([dict(item, answer=item["answer"] + " Revised.") for item in ITEMS[:2]])
+    assert len(index._dead) == 2 and len(index._doc_ids) == 7
+    index.upsert([dict(ITEMS[2], answer="Revised.")])
+    assert not index._dead and len(index._doc_ids) == 5
+    assert set(ids(index.search("revised", top_k=5))) == {"q1", "q2", "q3"}
+    assert index.search("resources") == []
+
+
+def test_deleted_docs_stay_out_after_save_load(index, tmp_path):
+    index.delete(["q5"])
+    path = str(tmp_path / "lexical.npz")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert len(loaded) == 4
+    assert sorted(loaded.ids()) == ["q1", "q2", "q3", "q4"]
+    assert loaded.search("virtual c++") == []
+    assert loaded.search("deadlock", top_k=5) == index.search("deadlock", top_k=5)
+
+
+def test_delete_tombstones(index):
+    assert index.delete(["q3", "missing"]) == 1
+    assert index.delete(["q3"]) == 0
+    assert len(index) == 4 and "q3" not in index.ids()
+    assert ids(index.search("deadlock")) == ["q2"]
+    assert len(index._doc_ids) == 5
+
+
+def test_delete_compacts_tombstones(index):
+    index.delete(["q1"])
+    assert index._dead == {0}
+    index.delete(["q2"])
+    assert not index._dead and sorted(index.ids()) == ["q3", "q4", "q5"]
+    assert ids(index.search("deadlock")) == ["q3"]
+
+
+def test_rrf_fuse_rewards_agreement():
+    fused = rrf_fuse([[{"id": "a"}, {"id": "b"}], [{"id": "b"}, {"id": "c"}]], top_k=2)
+    assert [h["id"] for h in fused] == ["b", "a"]
+    assert fused[0]["rrf"] == pytest.approx(1 / 62 + 1 / 61)
@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+
+from local_index import LocalIndex
+
+
+def record(item_id, vector, topic):
+    return {"id": item_id, "vector": vector, "meta": {"topic": topic, "question": f"{item_id}?"}, "filter": {"topic": topic}}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LocalIndex(str(tmp_path / "local_index"))
+    index.upsert([
+        record("a", [1.0, 0.0, 0.0], "DBMS"),
+        record("b", [0.9, 0.1, 0.0], "OS"),
+        record("c", [0.0, 1.0, 0.0], "DBMS"),
+        record("d", [0.0, 0.0, 1.0], "Networks"),
+    ])
+    return index
+
+
+def ids(hits):
+    return [h["id"] for h in hits]
+
+
+def test_query_ranks_by_cosine(index):
+    hits = index.query([1.0, 0.0, 0.0], top_k=2)
+    assert ids(hits) == ["a", "b"]
+    assert hits[0]["similarity"] == pytest.approx(1.0, abs=1e-3)
+    assert hits[0]["meta"] == {"topic": "DBMS", "question": "a?"}
+
+
+def test_query_batch(index):
+    hits = index.query_batch([[1.0, 0.0, 0.0], [0.0, 0.0, 1.0]], top_k=1)
+    assert [ids(h) for h in hits] == [["a"], ["d"]]
+
+
+def test_upsert_replaces_existing_id(index):
+    index.upsert([record("a", [0.0, 0.1, 1.0], "Networks")])
+    assert len(index) == 4
+    hits = index.query([0.0, 0.1, 1.0], top_k=2)
+    assert ids(hits) == ["a", "d"] and hits[0]["meta"]["topic"] == "Networks"
+
+
+def test_dimension_mismatch(index):
+    with pytest.raises(ValueError):
+        index.upsert([record("e", [1.0, 0.0], "OS")])
+
+
+def test_save_load_round_trip(index):
+    index.save()
+    loaded = LocalIndex.load(index.path)
+    assert len(loaded) == 4 and loaded.dimension == 3
+    assert loaded.dtype == np.float16
+    for query in ([1.0, 0.0, 0.0], [0.2, 0.7, 0.1]):
+        assert ids(loaded.query(query, top_k=4)) == ids(index.query(query, top_k=4))
+    assert loaded.query([1.0, 0.0, 0.0], top_k=1)[0]["meta"] == {"topic": "DBMS", "question": "a?"}
+
+
+def test_load_missing_directory_is_empty(tmp_path):
+    index = LocalIndex.load(str(tmp_path / "missing"))
+    assert len(index) == 0
+    assert index.query([1.0, 0.0], top_k=3) == []
+
+
+def test_upsert_after_memory_mapped_load(index):
+    index.save()
+    loaded = LocalIndex.load(index.path)
+    assert isinstance(loaded._vectors, np.memmap)
+
+    loaded.upsert([record("e", [0.0, 1.0, 1.0], "OS"), record("a", [0.0, 1.0, 0.2], "OS")])
+    assert len(loaded) == 5
+    assert ids(loaded.query([0.0, 1.0, 0.0], top_k=3)) == ["c", "a", "e"]
+
+    loaded.save()
+    reloaded = LocalIndex.load(index.path)
+    assert len(reloaded) == 5
+    assert ids(reloaded.query([0.0, 1.0, 1.0], top_k=1)) == ["e"]
+
+
+def test_eq_filter(index):
+    assert ids(index.query([1.0, 0.0, 0.0], top_k=5, filter=[{"topic": {"$eq": "DBMS"}}])) == ["a", "c"]
+    assert index.query([1.0, 0.0, 0.0], top_k=5, filter=[{"topic": {"$eq": "Compilers"}}]) == []
+
+
+def test_in_filter(index):
+    hits = index.query([0.0, 0.0, 1.0], top_k=5, filter=[{"topic": {"$in": ["OS", "Networks"]}}])
+    assert ids(hits) == ["d", "b"]
+
+
+def test_unsupported_filter_operator(index):
+    with pytest.raises(ValueError):
+        index.query([1.0, 0.0, 0.0], filter=[{"topic": {"$ne": "OS"}}])
+
+
+def test_filters_follow_upserts_and_persist(index):
+    index.upsert([record("a", [0.0, 0.1, 1.0], "Networks")])
+    assert ids(index.query([0.0, 0.0, 1.0], top_k=5, filter=[{"topic": {"$eq": "Networks"}}])) == ["d", "a"]
+    assert ids(index.query([0.0, 0.0, 1.0], top_k=5, filter=[{"topic": {"$eq": "DBMS"}}])) == ["c"]
+
+    index.save()
+    loaded = LocalIndex.load(index.path)
+    assert ids(loaded.query([1.0, 0.0, 0.0], top_k=5, filter=[{"topic": {"$eq": "DBMS"}}])) == ["c"]
+    # a write after the memory-mapped load keeps every row's filter
+    loaded.upsert([record("e", [1.0, 0.0, 0.0], "DBMS")])
+    assert ids(loaded.query([1.0, 0.0, 0.0], top_k=5, filter=[{"topic": {"$eq": "DBMS"}}])) == ["e", "c"]
+    assert ids(loaded.query([1.0, 0.0, 0.0], top_k=5, filter=[{"topic": {"$eq": "OS"}}])) == ["b"]
+
+
+def test_delete(index):
+    assert index.delete(["b", "missing"]) == 1
+    assert index.delete(["missing"]) == 0
+    assert len(index) == 3
+    assert ids(index.query([1.0, 0.0, 0.0], top_k=5)) == ["a", "c", "d"]
+    assert index.query([1.0, 0.0, 0.0], top_k=5, filter=[{"topic": {"$eq": "OS"}}]) == []
+
+    index.save()
+    loaded = LocalIndex.load(index.path)
+    assert len(loaded) == 3
+    loaded.delete(["a"])
+    loaded.upsert([record("b", [1.0, 0.0, 0.0], "OS")])
+    assert ids(loaded.query([1.0, 0.0, 0.0], top_k=1)) == ["b"]
+
+
+def test_delete_everything(index):
+    assert index.delete(["a", "b", "c", "d"]) == 4
+    assert len(index) == 0
+    assert index.query([1.0, 0.0, 0.0]) == []
+    index.upsert([record("x", [0.0, 1.0], "OS")])
+    assert ids(index.query([0.0, 1.0])) == ["x"]
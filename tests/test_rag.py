@@ -0,0 +1,125 @@
+import os
+
+import pytest
+
+import rag
+from corpus import iter_records
+from lexical_index import BM25Index
+
+BANK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "placement_kb.jsonl")
+
+
+@pytest.fixture
+def bank_index(monkeypatch):
+    index = BM25Index()
+    index.upsert(iter_records(BANK))
+    monkeypatch.setattr(rag, "get_lexical_index", lambda: index)
+    return index
+
+
+def no_embedding(text):
+    raise AssertionError(f"embedded {text!r}")
+
+
+@pytest.mark.parametrize("question, expected", [("TCP vs UDP", "Explain TCP vs UDP"), ("CAP theorem", "What is CAP theorem?"),
+                                                 ("Explain TCP vs UDP", "Explain TCP vs UDP")])
+def test_keyword_questions_take_the_lexical_fast_path(bank_index, monkeypatch, question, expected):
+    monkeypatch.setattr(rag, "get_embedding", no_embedding)
+    results, sources = rag.retrieve(question, "All Topics", 5, mode="hybrid")
+    # only the confident hit, not the questions that merely share "explain"
+    assert [r["meta"]["question"] for r in results] == [expected]
+    assert sources[0]["score_type"] == "BM25"
+
+
+def test_single_term_question_falls_back_to_vector_search(bank_index, monkeypatch):
+    question = "What is a pointer?"
+    assert rag.lexical_fast_path(question, rag.lexical_search(question, "All Topics", 5), 5) == []
+    embedded = []
+    monkeypatch.setattr(rag, "get_embedding", lambda text: embedded.append(text) or [1.0, 0.0])
+    monkeypatch.setattr(rag, "get_vector_index", lambda: None)
+    monkeypatch.setattr(rag, "search_index", lambda index, vec, topic, top_k: [])
+    _, sources = rag.retrieve(question, "All Topics", 5, mode="hybrid")
+    assert embedded == [question]
+    assert sources and sources[0]["score_type"] == "RRF"
+
+
+def test_fast_path_needs_a_full_match_in_the_best_question(bank_index):
+    for question in ("explain polymorphism in java", "how does garbage collection work"):
+        assert rag.lexical_fast_path(question, rag.lexical_search(question, "All Topics", 5), 5) == []
+
+
+class FakeCorpus:
+    def __init__(self, items):
+        self.items = items
+
+    def iter_items(self):
+        return iter(self.items)
+
+
+def test_evaluate_retrieval_embeds_each_query_once(bank_index, monkeypatch):
+    items = list(iter_records(BANK))[:6]
+    embedded = []
+    monkeypatch.setattr(rag, "load_corpus", lambda: FakeCorpus(items))
+    monkeypatch.setattr(rag, "get_embedding", lambda text: embedded.append(text) or [1.0, 0.0])
+    monkeypatch.setattr(rag, "get_vector_index", lambda: None)
+    monkeypatch.setattr(rag, "search_index", lambda index, vec, topic, top_k: [])
+
+    rows = rag.evaluate_retrieval(sample_size=6, top_k=5)
+    assert len(embedded) == len(set(embedded)) == 6
+    assert not any(item["question"] in embedded for item in items)
+    assert [row["mode"] for row in rows] == ["vector", "lexical", "hybrid"]
+    assert rows[1]["embed ms"] is None and rows[0]["embed ms"] == rows[2]["embed ms"]
+
+
+class FakeIndex:
+    # hits alternate between two topics; reject_filter makes a filtered query fail with a 400,
+    # reject_all makes every query fail that way
+    def __init__(self, reject_filter=False, reject_all=False, hits=40):
+        self.reject_filter = reject_filter
+        self.reject_all = reject_all
+        self.hits = [{"id": f"q{i}", "meta": {"topic": "OS" if i % 2 else "DBMS"}} for i in range(hits)]
+        self.calls = []
+
+    def query(self, vector, top_k=10, filter=None):
+        self.calls.append((top_k, filter is not None))
+        if self.reject_all or (filter is not None and self.reject_filter):
+            raise rag.APIException("bad request")
+        if filter is not None:
+            return []
+        return self.hits[:top_k]
+
+
+@pytest.fixture
+def filter_memo(monkeypatch):
+    monkeypatch.setattr(rag, "FILTER_UNSUPPORTED", set())
+    return rag.FILTER_UNSUPPORTED
+
+
+def test_empty_filtered_result_is_an_answer(filter_memo):
+    index = FakeIndex()
+    assert rag.query_index(index, [1.0], "OS", 5) == []
+    assert index.calls == [(5, True)]
+    assert not filter_memo
+
+
+def test_rejected_filter_falls_back_to_overfetch_and_is_remembered(filter_memo):
+    index = FakeIndex(reject_filter=True)
+    results = rag.query_index(index, [1.0], "OS", 5)
+    assert [r["id"] for r in results] == ["q1", "q3", "q5", "q7", "q9"]
+    assert index.calls == [(5, True), (20, False)]
+    assert id(index) in filter_memo
+
+    index.calls.clear()
+    assert len(rag.query_index(index, [1.0], "OS", 5)) == 5
+    assert index.calls == [(20, False)]
+
+
+def test_other_bad_requests_propagate_without_disabling_filters(filter_memo):
+    index = FakeIndex(reject_all=True)
+    with pytest.raises(rag.APIException):
+        rag.query_index(index, [1.0], "OS", 5)
+    assert not filter_memo
+
+    index.reject_all = False
+    assert rag.query_index(index, [1.0], "OS", 5) == []
+    assert index.calls[-1] == (5, True)